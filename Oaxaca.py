@@ -1,16 +1,23 @@
 import pandas as pd 
 import numpy as np 
 import statsmodels.api as sm
+from statsmodels.stats.oaxaca import OaxacaBlinder
+import os
 import warnings
 try:
     import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Patch
+    from matplotlib.backends.backend_pdf import PdfPages
 except ImportError:
     warnings.warn("Matplotlib failed to import", ImportWarning)
 
 class Oaxaca:
 
-    def __init__(self, data, by, endo, debug = True):
+    def __init__(self, data, by, endo, debug = True, verbose = True):
         
+        #With verbose = False nothing is printed, the effects are only returned
+        self.verbose = verbose
         self.data = data
         self.by = by
         self.df_type = ""
@@ -41,12 +48,22 @@ class Oaxaca:
 
         self.cotton_fix_model = 0
 
+        self.groups = None
+        self.multi_model = None
+
+        #Arrow tables and Polars DataFrames are handed to pandas with one block per column,
+        #so numeric columns keep sharing the Arrow buffers instead of being copied
+        if str(type(self.data)).find('pyarrow') != -1 or str(type(self.data)).find('polars') != -1:
+            if hasattr(self.data, 'to_arrow'):
+                self.data = self.data.to_arrow()
+            self.data = self.data.to_pandas(split_blocks = True)
+
         #A bunch of error checking
-        if type(self.data) != type(pd.DataFrame()) and type(self.data) != type(np.array(1)):
-            raise ValueError('The data must be in a DataFrame or a numpy array')
+        if not isinstance(self.data, (pd.DataFrame, np.ndarray)):
+            raise ValueError('The data must be in a DataFrame, an Arrow table, or a numpy array')
 
 
-        if type(self.data) == type(pd.DataFrame()):
+        if isinstance(self.data, pd.DataFrame):
             #By must be a string
             if type(self.by) != str:
                 raise ValueError('The "by" variable must be a string if datatype is {}'.format(type(self.data)))
@@ -63,7 +80,7 @@ class Oaxaca:
 
             self.df_type = 'df'
 
-        if type(self.data) == type(np.array(1)):
+        if isinstance(self.data, np.ndarray):
             #By must be an integer to index the numpy array
             if type(self.by) != int:
                 raise ValueError('The "by" variable must be a int if datatype is {}'.format(type(self.data)))
@@ -81,16 +98,22 @@ class Oaxaca:
             self.data = pd.DataFrame(self.data)
             split = self.data.iloc[:,by].value_counts().index
             
-            #We need binary differences for this value
-            if len(split) != 2:
-                print("These are the attempted split values: {}".format(split))
-                raise KeyError('There are more than 2 unique values in the by columns')
+            #We need at least binary differences for this value
+            if len(split) < 2:
+                if self.verbose:
+                    print("These are the attempted split values: {}".format(split))
+                raise KeyError('There are less than 2 unique values in the by columns')
 
-            print("These are the attempted split values: {}".format(split))
+            if self.verbose:
+                print("These are the attempted split values: {}".format(split))
             
             self.t_x = self.data.drop(self.data.columns[endo], axis = 1)
             self.t_y = self.data.iloc[:, endo]
 
+            if len(split) > 2:
+                self.multi_fit(split)
+                return
+
             self.f_df = self.data[self.data.iloc[:, by] == split[0]]
             self.s_df = self.data[self.data.iloc[:, by] != split[0]]
            
@@ -107,15 +130,21 @@ class Oaxaca:
         if self.df_type == 'df':
             split = self.data[by].value_counts().index
             
-            if len(split) != 2:
-                print("These are the attempted split values: {}".format(split))
-                raise KeyError('There are more than 2 unique values in the by columns')
+            if len(split) < 2:
+                if self.verbose:
+                    print("These are the attempted split values: {}".format(split))
+                raise KeyError('There are less than 2 unique values in the by columns')
 
-            print("These are the attempted split values: {}".format(split))
+            if self.verbose:
+                print("These are the attempted split values: {}".format(split))
             
             self.t_x = self.data.drop([endo], axis = 1)
             self.t_y = self.data[endo]
 
+            if len(split) > 2:
+                self.multi_fit(split)
+                return
+
 
             self.f_df = self.data[self.data[by] == split[0]]
             self.s_df = self.data[self.data[by] != split[0]]
@@ -130,8 +159,39 @@ class Oaxaca:
             self.s_x = sm.add_constant(self.s_x)
             self.t_x = sm.add_constant(self.t_x)
 
+        #The groups are put in order once here, so two_fold and three_fold
+        #only read them and repeated or mixed calls never swap them back and forth
+        self.f_mean = self.f_y.mean()
+        self.s_mean = self.s_y.mean()
+
+        #The wrong first is first
+        if self.f_mean - self.s_mean < 0:
+            self.fix()
         
 
+    def multi_fit(self, split):
+        #With more than two groups every group's model is fit once by the StatsModels OaxacaBlinder
+        #and the pairs are decomposed from it with pairwise, two_fold and three_fold need two groups
+        self.groups = split
+        self.multi_model = OaxacaBlinder(self.t_y, sm.add_constant(self.t_x), self.by, swap = False)
+
+
+    def pairwise(self, two_fold = True, two_fold_type = 'pooled', reference = None):
+        #Decomposes every pair of groups when the by column has more than two values.
+        #Entry [i, j] of each array in params is the decomposition of groups[i] against groups[j],
+        #the groups are in the order of the results' groups attribute.
+        #With a reference group only the pairs with it are decomposed.
+        if self.multi_model is None:
+            raise ValueError('pairwise needs more than 2 unique values in the by column, use two_fold or three_fold')
+
+        return self.multi_model.pairwise(2 if two_fold == True else 3, two_fold_type = two_fold_type, reference = reference)
+
+
+    def check_two_groups(self):
+        if self.multi_model is not None:
+            raise ValueError('There are more than 2 unique values in the by columns, use pairwise')
+
+
     def fix(self):
         #There may be issues with the "first" dataframe not being the correct one
         #we remidy this by flipping the two if the gap is negative
@@ -142,8 +202,7 @@ class Oaxaca:
 
 
     def three_fold(self, plot = False, round_val = 5):
-        self.f_mean = self.f_y.mean()
-        self.s_mean = self.s_y.mean()
+        self.check_two_groups()
 
         if round_val != False:
             try:
@@ -151,10 +210,6 @@ class Oaxaca:
             except ValueError:
                 raise ValueError("Your round value must either by an int or be able to be casted into one.")
         
-        #The wrong first is first
-        if self.f_mean - self.s_mean < 0:
-            self.fix()
-        
         self.f_model = sm.OLS(self.f_y, self.f_x).fit()
         self.s_model = sm.OLS(self.s_y, self.s_x).fit()
 
@@ -176,10 +231,11 @@ class Oaxaca:
             self.three_gap = round(self.three_gap, round_val)
 
 
-        print("Characteristic Effect: {}".format(self.char_eff))
-        print("Coefficent Effect: {}".format(self.coef_eff))
-        print("Interaction Effect: {}".format(self.int_eff))
-        print("Gap: {}".format(self.three_gap))
+        if self.verbose:
+            print("Characteristic Effect: {}".format(self.char_eff))
+            print("Coefficent Effect: {}".format(self.coef_eff))
+            print("Interaction Effect: {}".format(self.int_eff))
+            print("Gap: {}".format(self.three_gap))
         
         if plot == True:
             self.plot(plt_type=3)
@@ -188,18 +244,13 @@ class Oaxaca:
 
 
     def two_fold(self, plot = False, round_val = 5):
-        self.f_mean = self.f_y.mean()
-        self.s_mean = self.s_y.mean()
+        self.check_two_groups()
         
         if round_val != False:
             try:
                 round_val = int(round_val)
             except ValueError:
                 raise ValueError("Your round value must either by an int or be able to be casted into one.")
-        
-        #The wrong first is first
-        if self.f_mean - self.s_mean < 0:
-            self.fix()
 
         self.t_model = sm.OLS(self.t_y, self.t_x).fit()
         self.t_params = self.t_model.params.drop(self.by)
@@ -217,9 +268,10 @@ class Oaxaca:
             self.explained = round(self.explained, round_val)
             self.two_gap = round(self.two_gap, round_val)
        
-        print('Unexplained Effect: {}'.format(self.unexplained))
-        print('Explained Effect: {}'.format(self.explained))
-        print('Gap: {}'.format(self.two_gap))
+        if self.verbose:
+            print('Unexplained Effect: {}'.format(self.unexplained))
+            print('Explained Effect: {}'.format(self.explained))
+            print('Gap: {}'.format(self.two_gap))
         if plot == True:
             self.plot(plt_type = 2)
 
@@ -253,8 +305,9 @@ class Oaxaca:
         f_val = f_1 + f_2
         s_val = s_1 + s_2
 
-        print("Characteristic Effect Variance: {}".format(f_val))
-        print("Coefficient Effect Variance: {}".format(s_val))
+        if self.verbose:
+            print("Characteristic Effect Variance: {}".format(f_val))
+            print("Coefficient Effect Variance: {}".format(s_val))
         return (f_val), (s_val)
 
 
@@ -281,9 +334,10 @@ class Oaxaca:
             self.cotton_unexplained = round(self.cotton_unexplained, round_val)
             self.cotton_explained = round(self.cotton_explained, round_val)
 
-        print('Unexplained Effect with Cotton Model: {}'.format(self.cotton_unexplained))
-        print('Explained Effect with Cotton Model: {}'.format(self.cotton_explained))
-        print('Gap: {}'.format(self.two_gap))
+        if self.verbose:
+            print('Unexplained Effect with Cotton Model: {}'.format(self.cotton_unexplained))
+            print('Explained Effect with Cotton Model: {}'.format(self.cotton_explained))
+            print('Gap: {}'.format(self.two_gap))
         if plot == True:
             self.plot(plt_type = 4)
 
@@ -376,3 +430,113 @@ class Oaxaca:
             self.two_fold(plot = plot, round_val = 5)
         if three_fold == True:
             self.three_fold(plot = plot, round_val = 5)
+
+
+
+#labels of the bars of each plot type, in the order of the effects that are drawn
+plot_labels = {
+    2: ('Explained', 'Unexplained', 'Total Gap'),
+    3: ('Character Effect', 'Coefficent Effect', 'Interaction Effect', 'Total Gap'),
+    4: ('Cotton Model Explained', 'Cotton Model Unexplained', 'Total Gap'),
+}
+
+plot_titles = {2: 'Two-Fold Oaxaca Plot', 3: 'Three-Fold Oaxaca Plot', 4: 'Cotton Model Oaxaca Plot'}
+
+
+def plot_many(results, path, plt_types = None, titles = None, ncols = 4, nrows = 3, fig_size = (16,12), ylabel = 'Oaxaca Values', color1 = 'seagreen', color2 = 'darkturquoise', color3 = 'steelblue', color4 = 'navy', dpi = 100):
+    #Draws many decompositions as small multiples, nrows by ncols to a page, without pyplot.
+    #results are the tuples returned by two_fold, three_fold and cotton_model, or anything
+    #with a params attribute like the StatsModels OaxacaResults.
+    #A path ending in .pdf is written as one multi-page pdf, otherwise each page is its own
+    #image named path with the page number added, e.g. report_0.png, report_1.png
+    #It returns the paths that were written.
+    values = [tuple(getattr(result, 'params', result)) for result in results]
+
+    #the plot type is taken from the results if not given, cotton models need it given
+    if plt_types is None:
+        plt_types = [getattr(result, 'model_type', 3 if len(vals) == 4 else 2) for result, vals in zip(results, values)]
+    elif type(plt_types) == int:
+        plt_types = [plt_types] * len(values)
+
+    if any(map((lambda plt_type: plt_type not in plot_labels), plt_types)):
+        raise ValueError("The plot types must be two, three, or four")
+
+    if titles is None:
+        titles = [plot_titles[plt_type] for plt_type in plt_types]
+
+    colors = (color1, color2, color3, color4)
+    per_page = ncols * nrows
+    pages = int(np.ceil(len(values) / per_page))
+
+    #one figure is made with four bars in every axes, for every page only the bars are updated
+    fig = Figure(figsize = fig_size, dpi = dpi)
+    axes = fig.subplots(nrows, ncols, squeeze = False).ravel()
+    bars = []
+    for ax in axes:
+        bars.append(ax.bar([0, 0, 0, .25], [0, 0, 0, 0], width = .25, color = colors).patches)
+        ax.set_xlim([-.2, .5])
+        ax.set_xticks([])
+        ax.axhline(y = 0, color = 'k', linestyle = '--')
+        ax.grid(zorder = 0)
+        ax.set_ylabel(ylabel)
+
+    if path.endswith('.pdf'):
+        pdf = PdfPages(path)
+        written = [path]
+    else:
+        pdf = None
+        root, ext = os.path.splitext(path)
+        written = []
+
+    try:
+        for page in range(pages):
+            handles = {}
+            for i, ax in enumerate(axes):
+                index = page * per_page + i
+                if index >= len(values):
+                    ax.set_visible(False)
+                    continue
+                ax.set_visible(True)
+
+                plt_type = plt_types[index]
+                vals = values[index]
+
+                if plt_type == 3:
+                    char_eff, coef_eff, int_eff, gap = vals[:4]
+                    x = [0, 0, 0, .25]
+                    height = [char_eff, coef_eff, -int_eff, gap]
+                    bottom = [0, char_eff, 0, 0]
+                else:
+                    unexplained, explained, gap = vals[:3]
+                    x = [0, 0, .25]
+                    height = [explained, unexplained, gap]
+                    bottom = [0, explained, 0]
+
+                for j, bar in enumerate(bars[i]):
+                    bar.set_visible(j < len(x))
+                    if j < len(x):
+                        bar.set_x(x[j] - .125)
+                        bar.set_y(bottom[j])
+                        bar.set_height(height[j])
+
+                #the limits are set from the bar ends instead of autoscaling
+                ends = np.concatenate((bottom, np.add(bottom, height), [0]))
+                margin = .05 * (ends.max() - ends.min()) + .15
+                ax.set_ylim(ends.min() - margin, ends.max() + margin)
+                ax.set_title(titles[index])
+
+                for label, color in zip(plot_labels[plt_type], colors):
+                    handles.setdefault((label, color), Patch(color = color, label = label))
+
+            legend = fig.legend(handles = list(handles.values()), loc = 'lower center', ncol = len(handles))
+            if pdf is not None:
+                pdf.savefig(fig)
+            else:
+                written.append('{}_{}{}'.format(root, page, ext))
+                fig.savefig(written[-1])
+            legend.remove()
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+    return written
@@ -10,10 +10,42 @@ a OaxacaResults Class:
 OaxacaBlinder:
 Two-Fold (two_fold)
 Three-Fold (three_fold)
+Pairwise (pairwise)
+Weight Sweep (weight_sweep)
+Counterfactual Scenarios (scenarios)
+Specification Search (specifications)
+Read-only Snapshot (freeze)
+
+OaxacaFit:
+Two-Fold (two_fold)
+Three-Fold (three_fold)
+
+OaxacaPartial:
+Combine Shards (merge)
+Decomposition (finalize)
+Serialization (to_bytes, from_bytes)
 
 OaxacaResults:
 Table Summary (summary)
 
+OaxacaPairwiseResults:
+Table Summary (summary)
+Single Pair (get)
+
+OaxacaSweepResults:
+Table Summary (summary)
+
+OaxacaScenarioResults:
+Table Summary (summary)
+
+OaxacaSpecResults:
+Table Summary (summary)
+
+OaxacaBatchResults:
+Add Decompositions (append, add)
+Export (to_pandas, to_arrow, to_parquet)
+Table Summary (summary)
+
 Oaxaca-Blinder is a statistical method that is used to explain
 the differences between two mean values. The idea is to show
 from two mean values what can be explained by the data and
@@ -45,9 +77,628 @@ A. S. Blinder "Wage Discrimination: Reduced Form and Structural
 Estimates," The Journal of Human Resources, 1973.
 """
 from statsmodels.regression.linear_model import OLS
+from statsmodels.tools.sm_exceptions import CollinearityWarning
 from statsmodels.tools.tools import add_constant
+from scipy.linalg import qr
+from concurrent.futures import CancelledError, Future
+from contextlib import contextmanager
 import numpy as np
 from textwrap import dedent
+import hashlib
+import io
+import os
+import threading
+import time
+import warnings
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+
+_BLOCKSIZE = 2 ** 16
+
+
+def _solve(xtx, xty, names):
+    """
+    Rank revealing solve of the normal equations
+
+    The Gram matrix is equilibrated and factored with a pivoted QR. The
+    columns past the numerical rank are named in a CollinearityWarning
+    and, like OLS, the minimum norm solution is returned.
+    """
+    scale = np.sqrt(np.diag(xtx))
+    scale[scale == 0] = 1
+    gram = xtx / np.outer(scale, scale)
+    r, pivot = qr(gram, mode='r', pivoting=True)
+    diag = np.abs(np.diag(r))
+    tol = len(diag) * 1e-12
+    rank = int(np.sum(diag > tol * diag[0]))
+    if rank < len(diag):
+        warnings.warn('exog has rank {} but {} columns, {} are collinear '
+                      'with the others and their params are not '
+                      'identified'.format(
+                        rank, len(diag),
+                        [names[i] for i in np.sort(pivot[rank:])]),
+                      CollinearityWarning)
+    return np.linalg.pinv(gram, rcond=tol, hermitian=True) @ (
+                                                xty / scale) / scale
+
+
+def _three_fold(mean_f, mean_s, params_f, params_s):
+    """
+    The three-fold effects, broadcasting over any leading axes
+    """
+    endow_eff = np.sum((mean_f - mean_s) * params_s, axis=-1)
+    coef_eff = np.sum(mean_s * (params_f - params_s), axis=-1)
+    int_eff = np.sum((mean_f - mean_s) * (params_f - params_s), axis=-1)
+    return endow_eff, coef_eff, int_eff
+
+
+def _two_fold(mean_f, mean_s, params_f, params_s, t_params):
+    """
+    The two-fold effects, broadcasting over any leading axes
+    """
+    unexplained = (np.sum(mean_f * (params_f - t_params), axis=-1)
+                   + np.sum(mean_s * (t_params - params_s), axis=-1))
+    explained = np.sum((mean_f - mean_s) * t_params, axis=-1)
+    return unexplained, explained
+
+
+def _weighted_params(two_fold_type, params_f, params_s, len_f, len_s,
+                     submitted_weight=None):
+    """
+    The cotton, reimers or self_submitted non-discriminatory params,
+    broadcasting over any leading axes
+    """
+    if two_fold_type == 'cotton':
+        weight = np.asarray(len_f / (len_f + len_s))
+    elif two_fold_type == 'reimers':
+        weight = np.asarray(.5)
+    else:
+        weight = np.asarray(submitted_weight)
+    weight = weight[..., None]
+    return weight * params_f + (1 - weight) * params_s
+
+
+def _scenario_effects(decomp_type, group, mean_f, mean_s, params_f,
+                      params_s, t_params, scenarios, shift):
+    """
+    The effects and the gap of the fitted means with the means of group
+    (0 or 1) replaced by, or shifted by, each row of scenarios,
+    broadcasting over any leading axes
+
+    Every effect is affine in the means of one group, so it is evaluated
+    at zero and at the unit vectors and then applied to all scenarios in
+    one matrix product.
+    """
+    k = scenarios.shape[-1]
+    basis = np.vstack((np.zeros(k), np.eye(k)))
+    means = [np.expand_dims(mean_f, -2), np.expand_dims(mean_s, -2)]
+    actual = means[group][..., 0, :]
+    means[group] = basis
+    params_f = np.expand_dims(params_f, -2)
+    params_s = np.expand_dims(params_s, -2)
+    if decomp_type == 3:
+        effects = _three_fold(means[0], means[1], params_f, params_s)
+    else:
+        effects = _two_fold(means[0], means[1], params_f, params_s,
+                            np.expand_dims(t_params, -2))
+    gap = (np.sum(means[0] * params_f, axis=-1)
+           - np.sum(means[1] * params_s, axis=-1))
+    results = []
+    for eff in effects + (gap,):
+        eff = eff + np.zeros(k + 1)
+        const, slope = eff[..., 0], eff[..., 1:] - eff[..., :1]
+        if shift:
+            const = const + np.sum(slope * actual, axis=-1)
+        results.append(const[..., None] + slope @ scenarios.T)
+    return tuple(results)
+
+
+def _deletion_update(inv, params, exog, endog, single=True):
+    """
+    The change in OLS params from deleting rows
+
+    This is (X'X)^-1 X_d' (I - H_dd)^-1 e_d for the deleted rows X_d. If
+    single, each row is deleted on its own and one update per row is
+    returned, otherwise the rows are deleted together.
+    """
+    proj = exog @ inv
+    resid = endog - exog @ params
+    if single:
+        leverage = np.sum(proj * exog, axis=1)
+        return proj * (resid / (1 - leverage))[:, None]
+    hat = proj @ exog.T
+    return proj.T @ np.linalg.solve(np.eye(len(endog)) - hat, resid)
+
+
+def _is_arrow(data):
+    """
+    Whether data is an Arrow table or array or a Polars frame or series
+
+    pandas objects also export Arrow streams, but are read as pandas.
+    """
+    name = str(type(data))
+    if name.find('pandas') != -1:
+        return False
+    return (name.find('pyarrow') != -1 or name.find('polars') != -1
+            or hasattr(data, '__arrow_c_stream__'))
+
+
+def _arrow_column(column):
+    """
+    A NumPy view of an Arrow array, only copied if it is chunked or has
+    a type NumPy cannot share, e.g. booleans
+    """
+    if hasattr(column, 'num_chunks'):
+        if column.num_chunks == 1:
+            column = column.chunk(0)
+        else:
+            column = column.combine_chunks()
+    return column.to_numpy(zero_copy_only=False)
+
+
+def _arrow_table(data):
+    """
+    The column names and NumPy views of the columns of an Arrow
+    compatible table
+    """
+    import pyarrow as pa
+    if hasattr(data, 'to_arrow'):
+        data = data.to_arrow()
+    if not isinstance(data, pa.Table):
+        data = pa.table(data)
+    return data.column_names, [_arrow_column(column)
+                               for column in data.columns]
+
+
+def _arrow_vector(data):
+    """
+    A NumPy view of an Arrow compatible array or single column table
+    """
+    if hasattr(data, 'to_arrow'):
+        data = data.to_arrow()
+    if hasattr(data, 'columns'):
+        return _arrow_table(data)[1][0]
+    return _arrow_column(data)
+
+
+class _ColumnTable(object):
+    """
+    A read-only two dimensional view of equal length columns
+
+    Only the rows that are indexed are stacked into an array, so a table
+    of Arrow buffers is never copied as a whole.
+    """
+    def __init__(self, columns):
+        self.columns = columns
+        self.shape = (len(columns[0]), len(columns))
+        self.dtype = np.result_type(*columns)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, column = key
+            return self.columns[column][rows]
+        return np.column_stack([column[key] for column in self.columns])
+
+
+def _resolve_data(endog, exog, bifurcate, absorb=None):
+    """
+    Reads endog and exog as arrays and the column names, with bifurcate
+    and the absorb columns resolved to column positions
+
+    Pandas input is converted to arrays, Arrow input is wrapped without
+    copying the columns and other input is kept as it is.
+    """
+    if absorb is not None and not isinstance(absorb, (list, tuple)):
+        absorb = [absorb]
+    if str(type(exog)).find('pandas') != -1:
+        names = [str(name) for name in exog.columns]
+        bifurcate = exog.columns.get_loc(bifurcate)
+        if absorb is not None:
+            absorb = [exog.columns.get_loc(col) for col in absorb]
+        endog, exog = np.array(endog), np.array(exog)
+    elif _is_arrow(exog):
+        names, columns = _arrow_table(exog)
+        if isinstance(bifurcate, str):
+            bifurcate = names.index(bifurcate)
+        if absorb is not None:
+            absorb = [names.index(col) if isinstance(col, str) else col
+                      for col in absorb]
+        exog = _ColumnTable(columns)
+        if _is_arrow(endog):
+            endog = _arrow_vector(endog)
+        else:
+            endog = np.asarray(endog)
+    else:
+        names = [str(i) for i in range(exog.shape[1])]
+    return endog, exog, names, bifurcate, absorb
+
+
+def _demean(data, codes, weights, tol=1e-10, maxiter=1000):
+    """
+    Sweeps the means of every factor in codes out of the columns of data
+
+    The factors are projected out in turn (alternating projections) until
+    the largest mean removed is below tol times the scale of the data.
+    data is changed in place and needs only the codes, never the dummies.
+    """
+    counts = [np.bincount(code, weights=weights) for code in codes]
+    scale = np.abs(data).max() + 1
+    for _ in range(maxiter):
+        largest = 0
+        for code, count in zip(codes, counts):
+            count = np.where(count > 0, count, 1)
+            for j in range(data.shape[1]):
+                means = np.bincount(code, weights=weights * data[:, j],
+                                    minlength=len(count)) / count
+                data[:, j] -= means[code]
+                largest = max(largest, np.abs(means).max())
+        if largest < tol * scale:
+            break
+    return data
+
+
+class _Progress(object):
+    """
+    The replicates done by a standard error computation and its cancel
+    flag, checked before every replicate
+    """
+    def __init__(self):
+        self.done = 0
+        self.total = None
+        self.cancelled = threading.Event()
+
+    def step(self, done, total):
+        if self.cancelled.is_set():
+            raise CancelledError('The standard errors were cancelled')
+        self.done, self.total = done, total
+
+
+_blas_lock = threading.Lock()
+_blas_caps = []
+_blas_limiter = []
+
+
+@contextmanager
+def _blas_threads(limit):
+    """
+    Caps the BLAS threads at limit while the block runs
+
+    The cap is process wide, so while calls overlap the smallest of
+    their caps holds and the original limits are restored once the last
+    of them is done.
+    """
+    if limit is None:
+        yield
+        return
+    if threadpoolctl is None:
+        raise ValueError('blas_threads needs threadpoolctl installed')
+    with _blas_lock:
+        _blas_caps.append(limit)
+        if not _blas_limiter:
+            _blas_limiter.append(threadpoolctl.threadpool_limits(
+                                    limits=limit, user_api='blas'))
+        else:
+            threadpoolctl.threadpool_limits(limits=min(_blas_caps),
+                                            user_api='blas')
+    try:
+        yield
+    finally:
+        with _blas_lock:
+            _blas_caps.remove(limit)
+            if not _blas_caps:
+                _blas_limiter.pop().restore_original_limits()
+            else:
+                threadpoolctl.threadpool_limits(limits=min(_blas_caps),
+                                                user_api='blas')
+
+
+def _fingerprint(endog, exog, options, blocksize=_BLOCKSIZE):
+    """
+    A content hash of the data and the options, read in blocks of rows
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((endog.shape, endog.dtype.str, exog.shape,
+                        exog.dtype.str, options)).encode())
+    for start in range(0, len(endog), blocksize):
+        stop = start + blocksize
+        digest.update(np.ascontiguousarray(endog[start:stop]).tobytes())
+        digest.update(np.ascontiguousarray(exog[start:stop]).tobytes())
+    return digest.hexdigest()
+
+
+class _DiskCache(object):
+    """
+    The arrays of one fingerprint, stored as an npz file in directory
+
+    Files are evicted least recently used first once the npz files in the
+    directory add up to more than max_size bytes.
+    """
+    def __init__(self, directory, max_size, fingerprint):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.path = os.path.join(directory, fingerprint + '.npz')
+        self.arrays = {}
+        try:
+            with np.load(self.path) as stored:
+                self.arrays = dict(stored)
+            os.utime(self.path)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # a truncated or corrupted file is removed, the arrays are
+            # then rebuilt and stored again
+            self.arrays = {}
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def get(self, name):
+        return self.arrays.get(name)
+
+    def put(self, **arrays):
+        self.arrays.update(arrays)
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.savez(f, **self.arrays)
+        os.replace(tmp, self.path)
+        self._evict()
+
+    def _evict(self):
+        paths = [os.path.join(self.directory, name)
+                 for name in os.listdir(self.directory)
+                 if name.endswith('.npz')]
+        sizes = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            sizes[path] = (stat.st_mtime, stat.st_size)
+        total = 0
+        for path in sorted(sizes, key=lambda path: -sizes[path][0]):
+            total += sizes[path][1]
+            if total > self.max_size and path != self.path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _moments_kernel(exog, endog, codes, weights, columns, n_chunks,
+                    nobs, xsum, xtx, xty, ysum):
+    """
+    Adds the moments of a block of rows to the accumulators in one pass
+
+    codes is the group of each row, -1 for none, and columns maps each
+    regressor to its column of exog, -1 for the constant. The rows are
+    split into n_chunks chunks, accumulated in parallel and then added
+    together.
+    """
+    n_rows = exog.shape[0]
+    n_groups, k = xsum.shape
+    part_nobs = np.zeros((n_chunks, n_groups))
+    part_xsum = np.zeros((n_chunks, n_groups, k))
+    part_xtx = np.zeros((n_chunks, n_groups, k, k))
+    part_xty = np.zeros((n_chunks, n_groups, k))
+    part_ysum = np.zeros((n_chunks, n_groups))
+    for chunk in numba.prange(n_chunks):
+        row = np.empty(k)
+        for i in range(chunk * n_rows // n_chunks,
+                       (chunk + 1) * n_rows // n_chunks):
+            g = codes[i]
+            if g < 0:
+                continue
+            for a in range(k):
+                if columns[a] < 0:
+                    row[a] = 1.
+                else:
+                    row[a] = exog[i, columns[a]]
+            w = weights[i]
+            part_nobs[chunk, g] += w
+            part_ysum[chunk, g] += w * endog[i]
+            for a in range(k):
+                weighted = w * row[a]
+                part_xsum[chunk, g, a] += weighted
+                part_xty[chunk, g, a] += weighted * endog[i]
+                for b in range(a, k):
+                    part_xtx[chunk, g, a, b] += weighted * row[b]
+    for chunk in range(n_chunks):
+        for g in range(n_groups):
+            nobs[g] += part_nobs[chunk, g]
+            ysum[g] += part_ysum[chunk, g]
+            for a in range(k):
+                xsum[g, a] += part_xsum[chunk, g, a]
+                xty[g, a] += part_xty[chunk, g, a]
+                for b in range(a, k):
+                    xtx[g, a, b] += part_xtx[chunk, g, a, b]
+                    if b != a:
+                        xtx[g, b, a] += part_xtx[chunk, g, a, b]
+
+
+if numba is not None:
+    # the threading layers of Numba are not safe to start from any thread
+    # (TBB hangs the interpreter at exit), so the parallel kernel is only
+    # run on the main thread and the serial one everywhere else
+    _moments_kernel_serial = numba.njit(_moments_kernel)
+    _moments_kernel = numba.njit(parallel=True, cache=True)(_moments_kernel)
+
+
+class _GroupMoments(object):
+    """
+    Counts, sums and cross products of the data of each group
+
+    The regressors of a group are exog without the bifurcate column and
+    with the constant appended if one is added. The bifurcate column is
+    constant within a group, so the moments of the pooled models follow
+    from the group moments as well.
+
+    Parameters
+    ----------
+    nobs: ndarray
+        The (weighted) number of rows of each group, (G,).
+    xsum: ndarray
+        The column sums of the regressors, (G, k).
+    xtx: ndarray
+        The Gram matrices X'X, (G, k, k).
+    xty: ndarray
+        X'y, (G, k).
+    ysum: ndarray
+        The sums of endog, (G,).
+    """
+    names = ('nobs', 'xsum', 'xtx', 'xty', 'ysum')
+
+    def __init__(self, nobs, xsum, xtx, xty, ysum):
+        self.nobs = nobs
+        self.xsum = xsum
+        self.xtx = xtx
+        self.xty = xty
+        self.ysum = ysum
+
+    @classmethod
+    def from_data(cls, endog, exog, bifurcate, groups, hasconst,
+                  weights=None, blocksize=_BLOCKSIZE, backend=None):
+        """
+        Accumulates the moments over blocks of rows
+
+        Only one block of rows is held in memory at a time, so exog can be
+        a read-only memmap. weights are optional integer or float row
+        weights, e.g. bootstrap counts.
+
+        backend is 'numpy' for a pass per group, the default, or 'numba'
+        for the compiled single pass over each block. The compiled pass is
+        spread over the Numba threads when called from the main thread and
+        runs serially on any other thread.
+        """
+        if backend is None:
+            backend = 'numpy'
+        if backend not in ('numpy', 'numba'):
+            raise ValueError('Unknown backend {}'.format(backend))
+        if backend == 'numba' and numba is None:
+            raise ValueError('The numba backend needs Numba installed')
+        n_groups = len(groups)
+        k = exog.shape[1] - 1 + (hasconst is False)
+        nobs = np.zeros(n_groups)
+        xsum = np.zeros((n_groups, k))
+        xtx = np.zeros((n_groups, k, k))
+        xty = np.zeros((n_groups, k))
+        ysum = np.zeros(n_groups)
+        if backend == 'numba':
+            groups = np.asarray(groups)
+            order = np.argsort(groups)
+            sorted_groups = groups[order]
+            columns = np.array([j for j in range(exog.shape[1])
+                                if j != bifurcate]
+                               + [-1] * (hasconst is False))
+            if threading.current_thread() is threading.main_thread():
+                if numba.config.THREADING_LAYER == 'default':
+                    # TBB, the default where installed, hangs the
+                    # interpreter at exit after a fork, so the fork safe
+                    # workqueue is pinned unless a layer was chosen
+                    numba.config.THREADING_LAYER = 'workqueue'
+                kernel = _moments_kernel
+                n_threads = numba.get_num_threads()
+            else:
+                kernel, n_threads = _moments_kernel_serial, 1
+        for start in range(0, len(endog), blocksize):
+            stop = start + blocksize
+            block = np.asarray(exog[start:stop], dtype=float)
+            endog_b = np.asarray(endog[start:stop], dtype=float)
+            bi_b = block[:, bifurcate]
+            if backend == 'numba':
+                found = np.minimum(np.searchsorted(sorted_groups, bi_b),
+                                   n_groups - 1)
+                codes = np.where(sorted_groups[found] == bi_b,
+                                 order[found], -1)
+                if weights is None:
+                    weights_b = np.ones(len(endog_b))
+                else:
+                    weights_b = np.asarray(weights[start:stop], dtype=float)
+                kernel(np.ascontiguousarray(block),
+                       np.ascontiguousarray(endog_b), codes,
+                       np.ascontiguousarray(weights_b), columns,
+                       max(1, min(n_threads, len(endog_b) // 1024)),
+                       nobs, xsum, xtx, xty, ysum)
+                continue
+            exog_b = np.delete(block, bifurcate, axis=1)
+            if hasconst is False:
+                exog_b = np.column_stack((exog_b, np.ones(len(exog_b))))
+            for i, group in enumerate(groups):
+                rows = bi_b == group
+                exog_g = exog_b[rows]
+                endog_g = endog_b[rows]
+                if weights is None:
+                    weighted = exog_g
+                    nobs[i] += len(endog_g)
+                    ysum[i] += endog_g.sum()
+                else:
+                    weights_g = weights[start:stop][rows]
+                    weighted = exog_g * weights_g[:, None]
+                    nobs[i] += weights_g.sum()
+                    ysum[i] += weights_g @ endog_g
+                xsum[i] += weighted.sum(axis=0)
+                xtx[i] += weighted.T @ exog_g
+                xty[i] += weighted.T @ endog_g
+        return cls(nobs, xsum, xtx, xty, ysum)
+
+    def means(self):
+        """
+        The regressor means and the endog mean of each group
+        """
+        return self.xsum / self.nobs[:, None], self.ysum / self.nobs
+
+    def params(self, names):
+        """
+        The OLS params of each group, (G, k)
+        """
+        return np.array([_solve(xtx, xty, names)
+                         for xtx, xty in zip(self.xtx, self.xty)])
+
+    def pooled_gram(self, index, values, indicator=True):
+        """
+        X'X and X'y of the groups in index pooled together
+
+        If indicator, the bifurcate column, whose value in each group is
+        given by values, is appended as the last regressor.
+        """
+        xtx = self.xtx[index].sum(axis=0)
+        xty = self.xty[index].sum(axis=0)
+        if indicator is False:
+            return xtx, xty
+        values = np.asarray(values, dtype=float)
+        cross = values @ self.xsum[index]
+        k = len(xty)
+        full_xtx = np.empty((k + 1, k + 1))
+        full_xtx[:k, :k] = xtx
+        full_xtx[:k, k] = full_xtx[k, :k] = cross
+        full_xtx[k, k] = values ** 2 @ self.nobs[index]
+        full_xty = np.append(xty, values @ self.ysum[index])
+        return full_xtx, full_xty
+
+    def pooled_params(self, index, values, names, indicator=True):
+        """
+        The OLS params of the groups in index pooled together
+
+        If indicator, the bifurcate column is included in the regression
+        and its parameter is dropped from the result.
+        """
+        xtx, xty = self.pooled_gram(index, values, indicator)
+        if indicator is False:
+            return _solve(xtx, xty, names)
+        return _solve(xtx, xty, names + ['bifurcate'])[:-1]
 
 
 class OaxacaBlinder(object):
@@ -66,7 +717,9 @@ class OaxacaBlinder(object):
         'bifurcate' is the column of the exogenous variable(s) that you
         wish to split on. This would generally be the group that you wish
         to explain the two means for. Int of the column for a NumPy array
-        or int/string for the name of the column in Pandas
+        or int/string for the name of the column in Pandas or Arrow. If the
+        column has more than two values, use pairwise for the
+        decompositions.
     hasconst: bool, optional
         Indicates whether the two exogenous variables include a user-supplied
         constant. If True, a constant is assumed. If False, a constant is added
@@ -80,6 +733,27 @@ class OaxacaBlinder(object):
     cov_kwdslist or None, optional
         See linear_model.RegressionResults.get_robustcov_results for a
         description required keywords for alternative covariance estimators
+    blocksize: int, optional
+        The number of rows read at a time when the group moments are
+        accumulated. Defaults to 65536.
+    cache_dir: string, optional
+        A directory to keep the group moments and bootstrap replicates in,
+        keyed by a hash of the data and the options. A model of the same
+        data then loads these instead of reading the data again and
+        rerunning the bootstrap. Off by default.
+    cache_size: int, optional
+        The size in bytes past which the least recently used files in
+        cache_dir are removed. Defaults to 1 GiB.
+    absorb: int, string or list, optional
+        Columns of exog with categorical codes, e.g. firm or region ids,
+        whose fixed effects are swept out of every model by alternating
+        projections instead of adding dummies. The decomposition then
+        covers the remaining covariates and the fixed_effects of the
+        results hold the combined contribution of the absorbed effects.
+        No constant is added, it is absorbed as well. Off by default.
+    backend: string, optional
+        How the group moments are accumulated, 'numpy' by default or
+        'numba' for a compiled kernel, see Notes.
 
     Notes
     -----
@@ -88,7 +762,26 @@ class OaxacaBlinder(object):
 
     You can access the models by using their code as an attribute, e.g.,
     _t_model for the total model, _f_model for the first model, _s_model for
-    the second model.
+    the second model. The models of every group are in _group_models, in
+    the order of groups.
+
+    exog can also be an Arrow table or anything that converts to one, like
+    a Polars DataFrame, with endog an Arrow array or Polars Series. The
+    columns are then read from the Arrow buffers without copying them.
+
+    The data is read once, in blocks of rows, to accumulate the counts,
+    means and cross products of each group. All params are solved from
+    these, so endog and exog can be read-only memmaps, e.g. from
+    np.load(..., mmap_mode='r'), and are never copied as a whole. The OLS
+    models above are only fit, from the rows they need, when accessed.
+    With backend='numba', each block is accumulated by a compiled kernel
+    in a single pass over its rows, spread over the Numba threads when the
+    model is built on the main thread.
+
+    The pooled and nuemark reference params are solved once and cached on
+    the instance, so repeated two_fold and pairwise calls only redo the
+    final dot products. A CollinearityWarning naming the dependent columns
+    is raised if the exogenous variables of any model are rank deficient.
 
     Examples
     --------
@@ -114,193 +807,949 @@ class OaxacaBlinder(object):
     """
 
     def __init__(self, endog, exog, bifurcate, hasconst=True,
-                 swap=True, cov_type='nonrobust', cov_kwds=None):
-        if str(type(exog)).find('pandas') != -1:
-            bifurcate = exog.columns.get_loc(bifurcate)
-            endog, exog = np.array(endog), np.array(exog)
+                 swap=True, cov_type='nonrobust', cov_kwds=None,
+                 blocksize=_BLOCKSIZE, cache_dir=None, cache_size=2 ** 30,
+                 absorb=None, backend='numpy'):
+        endog, exog, names, bifurcate, absorb = _resolve_data(
+                                endog, exog, bifurcate, absorb)
+        if absorb is not None:
+            # the absorbed effects take the place of the constant, so only
+            # the columns that vary are kept as covariates
+            data = np.asarray(exog[:], dtype=float)
+            self._covariates = [j for j in range(exog.shape[1])
+                                if j != bifurcate and j not in absorb
+                                and np.ptp(data[:, j]) > 0]
+            self._absorb_codes = [np.unique(data[:, j], return_inverse=True)[1]
+                                  for j in absorb]
+            names = [names[j] for j in self._covariates]
+        else:
+            del names[bifurcate]
+            if hasconst is False:
+                names.append('const')
+        self.absorb = absorb
 
         self.two_fold_type = None
+        self.submitted_n = None
+        self.submitted_conf = None
+        self.submitted_weight = None
+        self._t_type = None
+        self._reference_cache = {}
+        self._reference_models = {}
+        self._group_model_cache = None
+        self._replicate_cache = {}
+        self._group_rows_cache = None
+        self._cache = None
+        self._names = names
         self.bifurcate = bifurcate
         self.cov_type = cov_type
         self.cov_kwds = cov_kwds
-        self.neumark = np.delete(exog, bifurcate, axis=1)
+        self.blocksize = blocksize
+        self.backend = backend
         self.exog = exog
         self.hasconst = hasconst
-        bi_col = exog[:, bifurcate]
-        endog = np.column_stack((bi_col, endog))
-        bi = np.unique(bi_col)
-        self.bi_col = bi_col
-
-        # split the data along the bifurcate axis, the issue is you need to
-        # delete it after you fit the model for the total model.
-        exog_f = exog[np.where(exog[:, bifurcate] == bi[0])]
-        exog_s = exog[np.where(exog[:, bifurcate] == bi[1])]
-        endog_f = endog[np.where(endog[:, 0] == bi[0])]
-        endog_s = endog[np.where(endog[:, 0] == bi[1])]
-        exog_f = np.delete(exog_f, bifurcate, axis=1)
-        exog_s = np.delete(exog_s, bifurcate, axis=1)
-        endog_f = endog_f[:, 1]
-        endog_s = endog_s[:, 1]
-        self.endog = endog[:, 1]
-
-        self.len_f, self.len_s = len(endog_f), len(endog_s)
-        self.gap = endog_f.mean() - endog_s.mean()
+        self.bi_col = exog[:, bifurcate]
+        self.endog = endog
+
+        stored = {}
+        if cache_dir is not None:
+            self._cache = _DiskCache(cache_dir, cache_size, _fingerprint(
+                                endog, exog,
+                                (bifurcate, hasconst, swap, absorb),
+                                blocksize))
+            stored = self._cache.arrays
+
+        if 'groups' in stored:
+            bi = stored['groups'].copy()
+            self._moments = _GroupMoments(*[stored[name]
+                                            for name in _GroupMoments.names])
+        else:
+            bi = np.unique(np.concatenate([
+                            np.unique(self.bi_col[start:start + blocksize])
+                            for start in range(0, len(endog), blocksize)]))
+            # one pass over the data collects the moments of every group,
+            # every decomposition (pairwise or the classic two group one)
+            # is built from these.
+            if absorb is not None:
+                self._moments = self._absorbed_moments(bi)
+            else:
+                self._moments = _GroupMoments.from_data(
+                                    endog, exog, bifurcate, bi, hasconst,
+                                    blocksize=blocksize, backend=backend)
+            if self._cache is not None:
+                self._cache.put(groups=bi, **{
+                        name: getattr(self._moments, name)
+                        for name in _GroupMoments.names})
+        self.groups = bi.copy()
+        self._group_means, self._group_endog_means = self._moments.means()
+        self._group_lens = self._moments.nobs.astype(int)
+        self._group_params = self._moments.params(names)
+
+        if len(bi) != 2:
+            self.bi = bi
+            return
+
+        first, second = 0, 1
+        self.gap = (self._group_endog_means[first]
+                    - self._group_endog_means[second])
 
         if swap and self.gap < 0:
-            endog_f, endog_s = endog_s, endog_f
-            exog_f, exog_s = exog_s, exog_f
-            self.gap = endog_f.mean() - endog_s.mean()
+            first, second = second, first
+            self.gap = (self._group_endog_means[first]
+                        - self._group_endog_means[second])
             bi[0], bi[1] = bi[1], bi[0]
 
         self.bi = bi
+        self._first, self._second = first, second
+        self.len_f = self._group_lens[first]
+        self.len_s = self._group_lens[second]
+        self.exog_f_mean = self._group_means[first]
+        self.exog_s_mean = self._group_means[second]
+        self._f_params = self._group_params[first]
+        self._s_params = self._group_params[second]
+
+    @property
+    def _group_models(self):
+        if self._group_model_cache is None:
+            self._group_model_cache = [
+                        self._fit(np.where(self.bi_col == group)[0], False)
+                        for group in self.groups]
+        return self._group_model_cache
+
+    @property
+    def _group_rows(self):
+        """
+        The row indices of the first and the second group, found once
+        """
+        if self._group_rows_cache is None:
+            self._group_rows_cache = [
+                        np.concatenate([
+                            start + np.flatnonzero(
+                                self.bi_col[start:start + self.blocksize]
+                                == group)
+                            for start in range(0, len(self.endog),
+                                               self.blocksize)])
+                        for group in self.bi[:2]]
+        return self._group_rows_cache
+
+    @property
+    def _f_model(self):
+        return self._group_models[self._first]
+
+    @property
+    def _s_model(self):
+        return self._group_models[self._second]
+
+    @property
+    def _t_model(self):
+        if self._t_type is None:
+            raise AttributeError('_t_model is only available after a pooled '
+                                 'or nuemark two_fold')
+        return self._reference_model(self._t_type)
+
+    def _std_task(self, decomp_type, n, conf, vce, d, m,
+                  two_fold_type=None, submitted_weight=None):
+        """
+        The standard errors of one decomposition as a function of a
+        _Progress, for lazy results. Every option is bound now, so later
+        calls on the model do not change them.
+        """
+        n = 5000 if n is None else n
+        conf = .99 if conf is None else conf
 
-        if hasconst is False:
-            exog_f = add_constant(exog_f, prepend=False)
-            exog_s = add_constant(exog_s, prepend=False)
-            self.exog = add_constant(self.exog, prepend=False)
-            self.neumark = add_constant(self.neumark, prepend=False)
+        def task(progress):
+            return self.variance(decomp_type, n, conf, vce, d, m,
+                                 two_fold_type, submitted_weight, progress)
+        return task
 
-        self.exog_f_mean = np.mean(exog_f, axis=0)
-        self.exog_s_mean = np.mean(exog_s, axis=0)
+    def _fixed_effects(self, *effects):
+        """
+        The part of the gap due to the absorbed effects, if any
+        """
+        if self.absorb is None:
+            return None
+        return self.gap - sum(effects)
 
-        self._f_model = OLS(endog_f, exog_f).fit(
-                                                cov_type=cov_type,
-                                                cov_kwds=cov_kwds)
-        self._s_model = OLS(endog_s, exog_s).fit(
-                                                cov_type=cov_type,
-                                                cov_kwds=cov_kwds)
+    def _check_two_groups(self):
+        if len(self.groups) != 2:
+            raise ValueError('bifurcate has {} groups, use pairwise for '
+                             'more than two groups'.format(len(self.groups)))
 
-    def variance(self, decomp_type, n=5000, conf=.99):
+    def _rows(self, rows):
         """
-        A helper function to calculate the variance/std. Used to keep
-        the decomposition functions cleaner
+        Reads the given rows as the group regressors, endog and the
+        bifurcate column
         """
-        if self.submitted_n is not None:
-            n = self.submitted_n
-        if self.submitted_conf is not None:
-            conf = self.submitted_conf
-        two_fold_type = self.two_fold_type
-        if self.submitted_weight is not None:
-            submitted_weight = [self.submitted_weight,
-                                1 - self.submitted_weight]
-        bi = self.bi
-        bifurcate = self.bifurcate
-        endow_eff_list = []
-        coef_eff_list = []
-        int_eff_list = []
-        exp_eff_list = []
-        unexp_eff_list = []
-        for _ in range(0, n):
-            endog = np.column_stack((self.bi_col, self.endog))
-            exog = self.exog
-            amount = len(endog)
-
-            samples = np.random.randint(0, high=amount, size=amount)
-            endog = endog[samples]
-            exog = exog[samples]
-            neumark = np.delete(exog, bifurcate, axis=1)
-
-            exog_f = exog[np.where(exog[:, bifurcate] == bi[0])]
-            exog_s = exog[np.where(exog[:, bifurcate] == bi[1])]
-            endog_f = endog[np.where(endog[:, 0] == bi[0])]
-            endog_s = endog[np.where(endog[:, 0] == bi[1])]
-            exog_f = np.delete(exog_f, bifurcate, axis=1)
-            exog_s = np.delete(exog_s, bifurcate, axis=1)
-            endog_f = endog_f[:, 1]
-            endog_s = endog_s[:, 1]
-            endog = endog[:, 1]
+        exog = np.asarray(self.exog[rows], dtype=float)
+        bi_col = exog[:, self.bifurcate]
+        exog = np.delete(exog, self.bifurcate, axis=1)
+        if self.hasconst is False:
+            exog = np.column_stack((exog, np.ones(len(exog))))
+        return exog, np.asarray(self.endog[rows], dtype=float), bi_col
+
+    def _absorbed(self, rows, weights=None, indicator=False):
+        """
+        The covariates and endog of rows, with the absorbed effects
+        swept out, and the row weights
+        """
+        exog = np.asarray(self.exog[rows], dtype=float)
+        columns = list(self._covariates)
+        if indicator:
+            columns.append(self.bifurcate)
+        if weights is None:
+            weights = np.ones(len(exog))
+        else:
+            weights = np.asarray(weights[rows], dtype=float)
+        data = np.column_stack((exog[:, columns],
+                                np.asarray(self.endog[rows], dtype=float)))
+        data = _demean(data, [code[rows] for code in self._absorb_codes],
+                       weights)
+        return data[:, :-1], data[:, -1], weights
+
+    def _absorbed_moments(self, groups, weights=None):
+        """
+        The group moments with the absorbed effects swept out of X'X and
+        X'y within each group, the sums are of the data as it is
+        """
+        k = len(self._covariates)
+        n_groups = len(groups)
+        moments = _GroupMoments(np.zeros(n_groups), np.zeros((n_groups, k)),
+                                np.zeros((n_groups, k, k)),
+                                np.zeros((n_groups, k)), np.zeros(n_groups))
+        for i, group in enumerate(groups):
+            rows = np.where(self.bi_col == group)[0]
+            exog, endog, row_weights = self._absorbed(rows, weights)
+            raw = np.asarray(self.exog[rows], dtype=float)[:, self._covariates]
+            moments.nobs[i] = row_weights.sum()
+            moments.xsum[i] = row_weights @ raw
+            moments.ysum[i] = row_weights @ np.asarray(self.endog[rows],
+                                                       dtype=float)
+            moments.xtx[i] = (exog * row_weights[:, None]).T @ exog
+            moments.xty[i] = (exog * row_weights[:, None]).T @ endog
+        return moments
+
+    def _absorbed_reference(self, groups, indicator, weights=None):
+        """
+        The pooled or nuemark params with the absorbed effects swept out
+        of the pooled sample of groups
+        """
+        rows = np.where(np.isin(self.bi_col, groups))[0]
+        exog, endog, row_weights = self._absorbed(rows, weights, indicator)
+        weighted = exog * row_weights[:, None]
+        names = self._names + ['bifurcate'] * indicator
+        params = _solve(weighted.T @ exog, weighted.T @ endog, names)
+        return params[:len(self._covariates)]
+
+    def _fit(self, rows, indicator):
+        """
+        Fits an OLS model on the given rows, only these rows are read
+        """
+        if self.absorb is not None:
+            if isinstance(rows, slice):
+                rows = np.arange(len(self.endog))[rows]
+            exog, endog, _ = self._absorbed(rows, indicator=indicator)
+            return OLS(endog, exog).fit(cov_type=self.cov_type,
+                                        cov_kwds=self.cov_kwds)
+        exog = np.asarray(self.exog[rows], dtype=float)
+        if indicator is False:
+            exog = np.delete(exog, self.bifurcate, axis=1)
+        if self.hasconst is False:
+            exog = add_constant(exog, prepend=False)
+        return OLS(np.asarray(self.endog[rows]), exog).fit(
+                                                cov_type=self.cov_type,
+                                                cov_kwds=self.cov_kwds)
 
-            two_fold_type = self.two_fold_type
+    def _pair_rows(self, pair):
+        if pair is None:
+            return slice(None)
+        return np.where((self.bi_col == self.groups[pair[0]])
+                        | (self.bi_col == self.groups[pair[1]]))[0]
 
-            if self.hasconst is False:
-                exog_f = add_constant(exog_f, prepend=False)
-                exog_s = add_constant(exog_s, prepend=False)
-                exog = add_constant(exog, prepend=False)
-                neumark = add_constant(neumark, prepend=False)
+    def _reference_model(self, two_fold_type, pair=None):
+        """
+        Returns the cached pooled or nuemark OLS model, fitting it if needed
 
-            _f_model = OLS(endog_f, exog_f).fit(
-                                                cov_type=self.cov_type,
-                                                cov_kwds=self.cov_kwds)
-            _s_model = OLS(endog_s, exog_s).fit(
-                                                cov_type=self.cov_type,
-                                                cov_kwds=self.cov_kwds)
-            exog_f_mean = np.mean(exog_f, axis=0)
-            exog_s_mean = np.mean(exog_s, axis=0)
+        pair restricts the sample to two of the groups, by their position
+        in groups.
+        """
+        key = (two_fold_type, pair, self.cov_type, repr(self.cov_kwds))
+        if key not in self._reference_models:
+            self._reference_models[key] = self._fit(
+                                    self._pair_rows(pair),
+                                    two_fold_type != 'nuemark')
+        return self._reference_models[key]
+
+    def _reference_params(self, two_fold_type, pair=None):
+        """
+        Returns the cached pooled or nuemark params, from the group moments
+        """
+        key = (two_fold_type, pair)
+        if key not in self._reference_cache:
+            if pair is None:
+                index = np.arange(len(self.groups))
+            else:
+                index = np.array(pair)
+            if self.absorb is not None:
+                self._reference_cache[key] = self._absorbed_reference(
+                                            self.groups[index],
+                                            two_fold_type != 'nuemark')
+                return self._reference_cache[key]
+            self._reference_cache[key] = self._moments.pooled_params(
+                                            index, self.groups[index],
+                                            self._names,
+                                            two_fold_type != 'nuemark')
+        return self._reference_cache[key]
+
+    def pairwise(self, decomp_type=2, two_fold_type='pooled',
+                 submitted_weight=None, reference=None):
+        """
+        Calculates the decompositions between every pair of groups
 
-            if decomp_type == 3:
-                endow_eff = (
-                            (exog_f_mean - exog_s_mean)
-                            @ _s_model.params)
-                coef_eff = exog_s_mean @ (_f_model.params - _s_model.params)
-                int_eff = (
-                            (exog_f_mean - exog_s_mean)
-                            @ (_f_model.params - _s_model.params))
-
-                endow_eff_list.append(endow_eff)
-                coef_eff_list.append(coef_eff)
-                int_eff_list.append(int_eff)
-
-            elif decomp_type == 2:
-                len_f = len(exog_f)
-                len_s = len(exog_s)
+        Parameters
+        ----------
+        decomp_type: int, optional
+            2 for the two-fold decomposition, 3 for the three-fold.
+        two_fold_type: string, optional
+            The non-discriminatory model used for the two-fold
+            decomposition, see two_fold. pooled and nuemark fit one
+            model per pair, the others only use the group models.
+        submitted_weight: int/float, required only for self_submitted
+            The weight of the first group of each pair.
+        reference: optional
+            The value of the reference group. If given, only the pairs
+            that include the reference group are calculated and the rest
+            are left as NaN.
 
-                if two_fold_type == 'cotton':
-                    t_params = (
-                                (len_f / (len_f + len_s)
-                                    * _f_model.params)
-                                + (len_s / (len_f + len_s)
-                                    * _s_model.params))
+        Returns
+        -------
+        OaxacaPairwiseResults
+            A results container where entry [i, j] of each effect is the
+            decomposition of group i against group j.
+        """
+        means = self._group_means
+        params = self._group_params
+        endog_means = self._group_endog_means
+        lens = self._group_lens
+        n_groups = len(self.groups)
+
+        # fitted mean of group a with the params of group b
+        cross = means @ params.T
+        own = np.diag(cross)
+        gap = endog_means[:, None] - endog_means[None, :]
+
+        if reference is None:
+            pairs = [(i, j) for i in range(n_groups)
+                     for j in range(i + 1, n_groups)]
+            mask = np.ones((n_groups, n_groups), dtype=bool)
+        else:
+            ref = np.where(self.groups == reference)[0]
+            if len(ref) == 0:
+                raise ValueError('reference is not one of the groups')
+            ref = ref[0]
+            pairs = [(ref, j) for j in range(n_groups) if j != ref]
+            mask = np.zeros((n_groups, n_groups), dtype=bool)
+            mask[ref, :] = mask[:, ref] = True
 
-                elif two_fold_type == 'reimers':
-                    t_params = .5 * (_f_model.params + _s_model.params)
+        if decomp_type == 3:
+            endow_eff = cross - own[None, :]
+            coef_eff = cross.T - own[None, :]
+            int_eff = own[:, None] - cross - cross.T + own[None, :]
+            results = (endow_eff, coef_eff, int_eff, gap)
 
+        else:
+            if two_fold_type in ('pooled', 'nuemark'):
+                t_params = np.zeros((n_groups, n_groups, params.shape[1]))
+                for i, j in pairs:
+                    t_params[i, j] = t_params[j, i] = (
+                        self._reference_params(two_fold_type, (i, j)))
+                explained = (np.einsum('ik,ijk->ij', means, t_params)
+                             - np.einsum('jk,ijk->ij', means, t_params))
+            else:
+                if two_fold_type == 'cotton':
+                    weight = lens[:, None] / (lens[:, None] + lens[None, :])
+                elif two_fold_type == 'reimers':
+                    weight = np.full((n_groups, n_groups), .5)
                 elif two_fold_type == 'self_submitted':
-                    t_params = (
-                            submitted_weight[0] * _f_model.params
-                            + submitted_weight[1] * _s_model.params)
+                    if submitted_weight is None:
+                        raise ValueError('Please submit weights')
+                    weight = np.full((n_groups, n_groups), submitted_weight)
+                else:
+                    raise ValueError('Unknown two_fold_type {}'.format(
+                                                            two_fold_type))
+                explained = (weight * (own[:, None] - cross.T)
+                             + (1 - weight) * (cross - own[None, :]))
+            unexplained = (own[:, None] - own[None, :]) - explained
+            results = (unexplained, explained, gap)
+
+        results = tuple(np.where(mask, eff, np.nan) for eff in results)
+        fixed_effects = None
+        if self.absorb is not None:
+            # the effects add up to the gap of the fitted means, the rest
+            # of the gap is due to the absorbed effects
+            fixed_effects = np.where(
+                            mask, gap - (own[:, None] - own[None, :]), np.nan)
+        return OaxacaPairwiseResults(results, decomp_type, self.groups,
+                                     fixed_effects=fixed_effects)
+
+    def weight_sweep(self, weights=None, std=False, n=None, conf=None):
+        """
+        Calculates the self_submitted two-fold decomposition for a grid
+        of weights at once
 
-                elif two_fold_type == 'nuemark':
-                    _t_model = OLS(endog, neumark).fit(
-                                                    cov_type=self.cov_type,
-                                                    cov_kwds=self.cov_kwds)
-                    t_params = _t_model.params
+        Parameters
+        ----------
+        weights: array_like, optional
+            The weights of the larger mean group, as submitted_weight in
+            two_fold. Defaults to 101 points from 0 to 1.
+        std: boolean, optional
+            If true, bootstrapped standard errors and bands will be
+            calculated for every weight from one set of resamples.
+        n: int, optional
+            A amount of iterations to calculate the bootstrapped
+            standard errors. This defaults to 5000.
+        conf: float, optional
+            This is the confidence required for the standard error
+            calculation and the bands. Defaults to .99.
 
-                else:
-                    _t_model = OLS(endog, exog).fit(
-                                    cov_type=self.cov_type,
-                                    cov_kwds=self.cov_kwds)
-                    t_params = np.delete(_t_model.params, bifurcate)
+        Returns
+        -------
+        OaxacaSweepResults
+            A results container with the effects for every weight.
+        """
+        self._check_two_groups()
+        if weights is None:
+            weights = np.linspace(0, 1, 101)
+        weights = np.asarray(weights, dtype=float)
+        grid = np.column_stack((weights, 1 - weights))
+
+        def sweep(mean_f, mean_s, params_f, params_s):
+            # the explained effect is linear in the weight, so the effects
+            # of every weight are one product with the grid
+            diff = mean_f - mean_s
+            ends = np.stack((np.sum(diff * params_f, axis=-1),
+                             np.sum(diff * params_s, axis=-1)), axis=-1)
+            explained = ends @ grid.T
+            own = (np.sum(mean_f * params_f, axis=-1)
+                   - np.sum(mean_s * params_s, axis=-1))
+            return np.expand_dims(own, -1) - explained, explained
+
+        unexplained, explained = sweep(self.exog_f_mean, self.exog_s_mean,
+                                       self._f_params, self._s_params)
+        std_val = None
+        bands = None
+        if std is True:
+            n = 5000 if n is None else n
+            conf = .99 if conf is None else conf
+            replicates = self._bootstrap(n)
+            means, params = replicates['means'], replicates['params']
+            high, low = int(n * conf), int(n * (1 - conf))
+            std_val, bands = [], []
+            for eff in sweep(means[:, 0], means[:, 1],
+                             params[:, 0], params[:, 1]):
+                eff = np.sort(eff, axis=0)[low: high]
+                std_val.append(eff.std(axis=0))
+                bands.append((eff[0], eff[-1]))
+
+        return OaxacaSweepResults(
+                        weights, (unexplained, explained, self.gap),
+                        std_val=std_val, bands=bands,
+                        fixed_effects=self._fixed_effects(
+                            unexplained[0], explained[0]))
+
+    def scenarios(self, means=None, shifts=None, group=None, decomp_type=2,
+                  two_fold_type='pooled', submitted_weight=None, std=False,
+                  n=None, conf=None):
+        """
+        Evaluates counterfactual covariate means for one group at once
+
+        Parameters
+        ----------
+        means: array_like, optional
+            The counterfactual means of the regressors of group, one row
+            per scenario, in the order of the regressors (the constant
+            included). A DataFrame is matched to them by column name.
+        shifts: array_like, optional
+            Shifts of the actual means of group instead, one row per
+            scenario. Regressors missing from a DataFrame are not
+            shifted. Give either means or shifts.
+        group: optional
+            The value of the group whose means are changed. Defaults to
+            the second group, the one with the smaller mean.
+        decomp_type: int, optional
+            2 for the two-fold decomposition, 3 for the three-fold.
+        two_fold_type: string, optional
+            The non-discriminatory model of the two-fold decomposition,
+            see two_fold.
+        submitted_weight: int/float, required only for self_submitted
+            The weight of the larger mean group.
+        std: boolean, optional
+            If true, bootstrapped standard errors and bands are calculated
+            for every scenario from the stored resamples. Shifts move
+            with the means of each resample, counterfactual means do not.
+        n: int, optional
+            A amount of iterations to calculate the bootstrapped
+            standard errors. This defaults to 5000.
+        conf: float, optional
+            This is the confidence required for the standard error
+            calculation and the bands. Defaults to .99.
+
+        Returns
+        -------
+        OaxacaScenarioResults
+            A results container with the effects and the gap of the
+            fitted means for every scenario.
+        """
+        self._check_two_groups()
+        if (means is None) == (shifts is None):
+            raise ValueError('Please give either means or shifts')
+        shift = means is None
+        values = shifts if shift else means
+        if hasattr(values, 'columns'):
+            values = values.reindex(columns=self._names,
+                                    fill_value=0 if shift else np.nan)
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        if values.shape[1] != len(self._names) or np.isnan(values).any():
+            raise ValueError('The scenarios need a value for each of the '
+                             'regressors {}'.format(self._names))
+        if group is None:
+            index = 1
+        elif group in self.bi[:2]:
+            index = list(self.bi[:2]).index(group)
+        else:
+            raise ValueError('group is not one of the groups')
+        if decomp_type == 2 and two_fold_type == 'self_submitted' and (
+                submitted_weight is None):
+            raise ValueError('Please submit weights')
 
-                unexplained = (
-                            (exog_f_mean
-                                @ (_f_model.params - t_params))
-                            + (exog_s_mean
-                                @ (t_params - _s_model.params)))
+        def t_params(params_f, params_s, len_f, len_s, pooled, nuemark):
+            if decomp_type == 3:
+                return None
+            if two_fold_type in ('cotton', 'reimers', 'self_submitted'):
+                return _weighted_params(two_fold_type, params_f, params_s,
+                                        len_f, len_s, submitted_weight)
+            if two_fold_type == 'nuemark':
+                return nuemark
+            return pooled
+
+        reference = None
+        if decomp_type == 2 and two_fold_type in ('pooled', 'nuemark'):
+            reference = self._reference_params(two_fold_type)
+        results = _scenario_effects(
+                        decomp_type, index, self.exog_f_mean,
+                        self.exog_s_mean, self._f_params, self._s_params,
+                        t_params(self._f_params, self._s_params, self.len_f,
+                                 self.len_s, reference, reference),
+                        values, shift)
+        std_val = None
+        bands = None
+        if std is True:
+            n = 5000 if n is None else n
+            conf = .99 if conf is None else conf
+            replicates = self._bootstrap(n)
+            means_r, params_r = replicates['means'], replicates['params']
+            nobs = replicates['nobs']
+            high, low = int(n * conf), int(n * (1 - conf))
+            std_val, bands = [], []
+            for eff in _scenario_effects(
+                        decomp_type, index, means_r[:, 0], means_r[:, 1],
+                        params_r[:, 0], params_r[:, 1],
+                        t_params(params_r[:, 0], params_r[:, 1], nobs[:, 0],
+                                 nobs[:, 1], replicates['pooled'],
+                                 replicates['nuemark']),
+                        values, shift):
+                eff = np.sort(eff, axis=0)[low: high]
+                std_val.append(eff.std(axis=0))
+                bands.append((eff[0], eff[-1]))
+
+        return OaxacaScenarioResults(values, results, decomp_type,
+                                     std_val=std_val, bands=bands)
+
+    def specifications(self, specs, decomp_type=2, two_fold_type='pooled',
+                       submitted_weight=None):
+        """
+        Calculates the decomposition for many subsets of the regressors
 
-                explained = (exog_f_mean - exog_s_mean) @ t_params
+        Every subset is solved from the rows and columns of the Gram
+        matrices of the full model, so the data is not read again.
 
-                unexp_eff_list.append(unexplained)
-                exp_eff_list.append(explained)
+        Parameters
+        ----------
+        specs: list or dict
+            The regressors of each specification, by name or position in
+            the regressors of the model. Keep the constant in each subset
+            unless the model is meant to have none. A dict maps labels to
+            the subsets, otherwise the names are joined as labels.
+        decomp_type: int, optional
+            2 for the two-fold decomposition, 3 for the three-fold.
+        two_fold_type: string, optional
+            The non-discriminatory model of the two-fold decomposition,
+            see two_fold.
+        submitted_weight: int/float, required only for self_submitted
+            The weight of the larger mean group.
+
+        Returns
+        -------
+        OaxacaSpecResults
+            A results container with the effects of every specification.
+        """
+        self._check_two_groups()
+        if self.absorb is not None:
+            raise ValueError('specifications are not available with '
+                             'absorbed effects')
+        if decomp_type == 2 and two_fold_type == 'self_submitted' and (
+                submitted_weight is None):
+            raise ValueError('Please submit weights')
+        if isinstance(specs, dict):
+            labels, specs = list(specs), list(specs.values())
+        else:
+            labels = None
+        columns = []
+        for spec in specs:
+            cols = []
+            for col in spec:
+                if not isinstance(col, str):
+                    col = self._names[col]
+                if col not in self._names:
+                    raise ValueError('{} is not one of the regressors {}'
+                                     .format(col, self._names))
+                cols.append(self._names.index(col))
+            columns.append(np.array(cols))
+        if labels is None:
+            labels = [', '.join(self._names[j] for j in cols)
+                      for cols in columns]
+
+        moments = self._moments
+        index = [self._first, self._second]
+        reference = decomp_type == 2 and two_fold_type not in (
+                                    'cotton', 'reimers', 'self_submitted')
+        if reference:
+            indicator = two_fold_type != 'nuemark'
+            t_xtx, t_xty = moments.pooled_gram(index, self.bi[:2], indicator)
+        results = []
+        for cols in columns:
+            names = [self._names[j] for j in cols]
+            block = np.ix_(cols, cols)
+            params_f, params_s = [_solve(moments.xtx[i][block],
+                                         moments.xty[i][cols], names)
+                                  for i in index]
+            mean_f = self.exog_f_mean[cols]
+            mean_s = self.exog_s_mean[cols]
+            if decomp_type == 3:
+                results.append(_three_fold(mean_f, mean_s, params_f,
+                                           params_s))
+                continue
+            if reference:
+                t_cols = cols
+                if indicator:
+                    t_cols = np.append(cols, len(self._names))
+                t_params = _solve(t_xtx[np.ix_(t_cols, t_cols)],
+                                  t_xty[t_cols],
+                                  names + ['bifurcate'] * indicator)
+                t_params = t_params[:len(cols)]
+            else:
+                t_params = _weighted_params(two_fold_type, params_f,
+                                            params_s, self.len_f, self.len_s,
+                                            submitted_weight)
+            results.append(_two_fold(mean_f, mean_s, params_f, params_s,
+                                     t_params))
+        results = tuple(np.array(eff) for eff in zip(*results))
+        return OaxacaSpecResults(labels, results + (self.gap,), decomp_type)
+
+    def variance(self, decomp_type, n=None, conf=None, vce='bootstrap', d=1,
+                 m=None, two_fold_type=None, submitted_weight=None,
+                 progress=None, rng=None):
+        """
+        A helper function to calculate the variance/std. Used to keep
+        the decomposition functions cleaner
+
+        n, conf, two_fold_type and submitted_weight default to those of
+        the last two_fold call, then to 5000 and .99. rng is a
+        np.random.RandomState to draw from instead of np.random, its
+        replicates are not cached.
+
+        vce is bootstrap, stratified, jackknife or subsample. stratified
+        resamples each group on its own, so every replicate keeps the
+        group sizes. subsample draws n subsamples of about m rows without
+        replacement, in proportion to the group sizes, and rescales the
+        spread of their effects by sqrt(m / (N - m)), which is
+        sqrt(m / N) for m much smaller than the N rows. m defaults to
+        N ** (2 / 3).
+        """
+        if two_fold_type is None:
+            two_fold_type = self.two_fold_type
+        if submitted_weight is None:
+            submitted_weight = self.submitted_weight
+        if vce == 'jackknife':
+            return self._jackknife(decomp_type, d, two_fold_type,
+                                   submitted_weight, progress, rng)
+        if n is None:
+            n = 5000 if self.submitted_n is None else self.submitted_n
+        if conf is None:
+            conf = .99 if self.submitted_conf is None else self.submitted_conf
+        scale = 1
+        if vce == 'subsample':
+            sizes = self._subsample_sizes(m)
+            total = self._group_lens[[self._first, self._second]].sum()
+            scale = np.sqrt(sizes.sum() / (total - sizes.sum()))
+            replicates = self._bootstrap(n, sizes, progress, rng)
+        elif vce in ('bootstrap', 'stratified'):
+            replicates = self._bootstrap(n, progress=progress, rng=rng,
+                                         stratified=vce == 'stratified')
+        else:
+            raise ValueError('Unknown vce {}'.format(vce))
+        means, params = replicates['means'], replicates['params']
 
-        high, low = int(n * conf), int(n * (1 - conf))
         if decomp_type == 3:
-            return([np.std(np.sort(endow_eff_list)[low: high]),
-                    np.std(np.sort(coef_eff_list)[low: high]),
-                    np.std(np.sort(int_eff_list)[low: high])
-                    ])
+            effects = _three_fold(means[:, 0], means[:, 1],
+                                  params[:, 0], params[:, 1])
+
         elif decomp_type == 2:
-            return([np.std(np.sort(unexp_eff_list)[low: high]),
-                    np.std(np.sort(exp_eff_list)[low: high])
-                    ])
+            if two_fold_type in ('cotton', 'reimers', 'self_submitted'):
+                t_params = _weighted_params(
+                                two_fold_type, params[:, 0], params[:, 1],
+                                replicates['nobs'][:, 0],
+                                replicates['nobs'][:, 1],
+                                submitted_weight)
+            elif two_fold_type == 'nuemark':
+                t_params = replicates['nuemark']
+            else:
+                t_params = replicates['pooled']
+            effects = _two_fold(means[:, 0], means[:, 1],
+                                params[:, 0], params[:, 1], t_params)
+
+        high, low = int(n * conf), int(n * (1 - conf))
+        return [scale * np.std(np.sort(eff)[low: high]) for eff in effects]
 
-    def three_fold(self, std=False, n=None, conf=None):
+    def _subsample_sizes(self, m=None):
+        """
+        The subsample size of the first and the second group for about m
+        rows in total, with room for every regressor in each group
+        """
+        lens = self._group_lens[[self._first, self._second]]
+        if m is None:
+            m = int(lens.sum() ** (2 / 3))
+        if not 0 < m < lens.sum():
+            raise ValueError('m must be between 0 and the number of rows, '
+                             '{}'.format(lens.sum()))
+        sizes = np.round(m * lens / lens.sum()).astype(int)
+        return np.minimum(np.maximum(sizes, len(self._names) + 1), lens)
+
+    def _bootstrap(self, n, sizes=None, progress=None, rng=None,
+                   stratified=False):
+        """
+        The group means, counts and params and the pooled and nuemark
+        params of n bootstrap resamples
+
+        If sizes are given, subsamples of sizes[0] rows of the first and
+        sizes[1] rows of the second group are drawn without replacement
+        instead, only these rows are read. If stratified, each group is
+        resampled with replacement to its own size, from the row indices
+        of the groups, and only the drawn rows are read. progress, a
+        _Progress, is stepped before every resample.
+
+        The replicates are shared by every decomposition type and kept
+        for repeated calls, on disk as well if a cache_dir was given.
+        Replicates drawn from an rng, a np.random.RandomState, are only
+        returned, which leaves the model untouched.
+        """
+        if rng is not None:
+            return self._draw_replicates(n, sizes, progress, rng, stratified)
+        names = ['means', 'params', 'nobs', 'pooled', 'nuemark']
+        if stratified:
+            key, prefix = ('stratified', n), 'stratified-{}'.format(n)
+        elif sizes is None:
+            key, prefix = n, 'bootstrap-{}'.format(n)
+        else:
+            key = ('subsample', n) + tuple(sizes)
+            prefix = 'subsample-{}-{}-{}'.format(n, *sizes)
+        if key in self._replicate_cache:
+            if progress is not None:
+                progress.step(n, n)
+            return self._replicate_cache[key]
+        if self._cache is not None:
+            stored = [self._cache.get('{}-{}'.format(prefix, name))
+                      for name in names]
+            if all(arr is not None for arr in stored):
+                self._replicate_cache[key] = dict(zip(names, stored))
+                if progress is not None:
+                    progress.step(n, n)
+                return self._replicate_cache[key]
+
+        replicates = self._draw_replicates(n, sizes, progress, np.random,
+                                           stratified)
+        self._replicate_cache[key] = replicates
+        if self._cache is not None:
+            self._cache.put(**{'{}-{}'.format(prefix, name): arr
+                               for name, arr in replicates.items()})
+        return replicates
+
+    def _draw_replicates(self, n, sizes, progress, rng, stratified=False):
+        """
+        Draws the replicates of _bootstrap from rng, np.random or a
+        np.random.RandomState
+        """
+        names = ['means', 'params', 'nobs', 'pooled', 'nuemark']
+        bi = self.bi
+        amount = len(self.endog)
+        replicates = {name: [] for name in names}
+        for i in range(0, n):
+            if progress is not None:
+                progress.step(i, n)
+            endog, exog, weights = self.endog, self.exog, None
+            if stratified or sizes is not None:
+                if stratified:
+                    rows = [group_rows[rng.randint(0, high=len(group_rows),
+                                                   size=len(group_rows))]
+                            for group_rows in self._group_rows]
+                else:
+                    rows = [rng.choice(group_rows, size, replace=False)
+                            for group_rows, size in zip(self._group_rows,
+                                                        sizes)]
+                # sorted, the rows are read front to back
+                rows = np.sort(np.concatenate(rows))
+                if self.absorb is None:
+                    # only the drawn rows are read
+                    endog, exog = self.endog[rows], self.exog[rows]
+                else:
+                    weights = np.bincount(rows, minlength=amount)
+            else:
+                # a resample is a vector of counts, the moments are
+                # accumulated with these as row weights
+                samples = rng.randint(0, high=amount, size=amount)
+                weights = np.bincount(samples, minlength=amount)
+            if self.absorb is not None:
+                moments = self._absorbed_moments(bi[:2], weights)
+                pooled = self._absorbed_reference(bi[:2], True, weights)
+                nuemark = self._absorbed_reference(bi[:2], False, weights)
+            else:
+                moments = _GroupMoments.from_data(
+                                endog, exog, self.bifurcate, bi[:2],
+                                self.hasconst, weights=weights,
+                                blocksize=self.blocksize,
+                                backend=self.backend)
+                pooled = moments.pooled_params([0, 1], bi[:2], self._names)
+                nuemark = moments.pooled_params([0, 1], bi[:2], self._names,
+                                                False)
+            replicates['means'].append(moments.means()[0])
+            replicates['params'].append(moments.params(self._names))
+            replicates['nobs'].append(moments.nobs)
+            replicates['pooled'].append(pooled)
+            replicates['nuemark'].append(nuemark)
+
+        if progress is not None:
+            progress.step(n, n)
+        return {name: np.array(arr) for name, arr in replicates.items()}
+
+    def _jackknife(self, decomp_type, d=1, two_fold_type=None,
+                   submitted_weight=None, progress=None, rng=None):
+        """
+        Jackknife standard errors from closed-form deletion updates
+
+        The params of each model are updated for the deleted rows from
+        its inverse Gram matrix and the leverages, so no model is refit.
+        With d = 1 every row is deleted on its own, otherwise the rows are
+        randomly split into blocks of about d rows that are deleted in
+        turn, drawn from rng if given. progress, a _Progress, is stepped
+        for every block of rows.
+        """
+        if self.absorb is not None:
+            raise ValueError('The jackknife is not available with absorbed '
+                             'effects, use the bootstrap')
+        if two_fold_type is None:
+            two_fold_type = self.two_fold_type
+        if submitted_weight is None:
+            submitted_weight = self.submitted_weight
+        bi = self.bi
+        index = [self._first, self._second]
+        moments = self._moments
+        nobs = moments.nobs[index]
+        if not 1 <= d <= nobs.sum():
+            raise ValueError('d must be between 1 and the number of rows, '
+                             '{}'.format(int(nobs.sum())))
+        xsum = moments.xsum[index]
+        params = self._group_params[index]
+        invs = [np.linalg.pinv(moments.xtx[i], hermitian=True)
+                for i in index]
+        reference = decomp_type == 2 and two_fold_type not in (
+                                    'cotton', 'reimers', 'self_submitted')
+        if reference:
+            indicator = two_fold_type != 'nuemark'
+            t_xtx, t_xty = moments.pooled_gram(index, bi[:2], indicator)
+            t_inv = np.linalg.pinv(t_xtx, hermitian=True)
+            t_params = t_inv @ t_xty
+
+        def deleted(exog, endog, bi_col, single):
+            # the effects after deleting each row (single) or all rows
+            reps = len(endog) if single else 1
+            new_params = np.repeat(params[None], reps, axis=0)
+            new_xsum = np.repeat(xsum[None], reps, axis=0)
+            new_nobs = np.repeat(nobs[None], reps, axis=0)
+            for g in (0, 1):
+                rows = bi_col == bi[g]
+                if not rows.any():
+                    continue
+                update = _deletion_update(invs[g], params[g], exog[rows],
+                                          endog[rows], single)
+                if single:
+                    new_params[rows, g] -= update
+                    new_xsum[rows, g] -= exog[rows]
+                    new_nobs[rows, g] -= 1
+                else:
+                    new_params[0, g] -= update
+                    new_xsum[0, g] -= exog[rows].sum(axis=0)
+                    new_nobs[0, g] -= rows.sum()
+            means = new_xsum / new_nobs[..., None]
+            params_f, params_s = new_params[:, 0], new_params[:, 1]
+            if decomp_type == 3:
+                return _three_fold(means[:, 0], means[:, 1],
+                                   params_f, params_s)
+            if reference:
+                t_exog = exog
+                if indicator:
+                    t_exog = np.column_stack((exog, bi_col))
+                new_t_params = t_params - _deletion_update(
+                                    t_inv, t_params, t_exog, endog, single)
+                if indicator:
+                    new_t_params = new_t_params[..., :-1]
+            else:
+                new_t_params = _weighted_params(
+                                    two_fold_type, params_f, params_s,
+                                    new_nobs[:, 0], new_nobs[:, 1],
+                                    submitted_weight)
+            return _two_fold(means[:, 0], means[:, 1], params_f, params_s,
+                             new_t_params)
+
+        replicates = []
+        amount = len(self.endog)
+        if d == 1:
+            blocks = [slice(start, start + self.blocksize)
+                      for start in range(0, amount, self.blocksize)]
+        else:
+            order = (np.random if rng is None else rng).permutation(amount)
+            blocks = [np.sort(rows)
+                      for rows in np.array_split(order, amount // d)]
+        for i, rows in enumerate(blocks):
+            if progress is not None:
+                progress.step(i, len(blocks))
+            replicates.append(deleted(*self._rows(rows), d == 1))
+        if progress is not None:
+            progress.step(len(blocks), len(blocks))
+        replicates = [np.concatenate(eff) for eff in zip(*replicates)]
+        m = len(replicates[0])
+        return [np.sqrt((m - 1) / m * np.sum((eff - eff.mean()) ** 2))
+                for eff in replicates]
+
+    def three_fold(self, std=False, n=None, conf=None, vce='bootstrap', d=1,
+                   m=None):
         """
         Calculates the three-fold Oaxaca Blinder Decompositions
 
         Parameters
         ----------
-        std: boolean, optional
+        std: boolean or 'lazy', optional
             If true, bootstrapped standard errors will be calculated.
+            If 'lazy', the results are returned at once and the standard
+            errors are calculated in the background when first needed,
+            see OaxacaResults.
         n: int, optional
             A amount of iterations to calculate the bootstrapped
             standard errors. This defaults to 5000.
@@ -309,40 +1758,67 @@ class OaxacaBlinder(object):
             calculation. Defaults to .99, but could be anything less
             than or equal to one. One is heavy discouraged, due to the
             extreme outliers inflating the variance.
+        vce: string, optional
+            The variance estimator, like the vce option of STATA.
+            bootstrap is assumed, stratified resamples within each group
+            so the group sizes are fixed, like the STATA default.
+            jackknife uses closed-form deletion updates of the fitted
+            models instead of refitting them. subsample draws n subsamples of m rows without replacement,
+            stratified by group, and rescales their spread to the full
+            sample, so the cost scales with m instead of the rows.
+        d: int, optional
+            The number of rows deleted in each jackknife replicate. The
+            rows are randomly split into blocks of about d rows for the
+            delete-d grouped jackknife. Defaults to 1.
+        m: int, optional
+            The subsample size of vce='subsample', split over the groups
+            in proportion to their sizes. Defaults to the number of rows
+            to the power 2/3.
 
         Returns
         -------
         OaxacaResults
             A results container for the three-fold decomposition.
         """
+        self._check_two_groups()
         self.n = n
         self.conf = conf
+        # the options of this call are passed on as they are, so earlier
+        # two_fold calls do not leak into the standard errors
+        n = 5000 if n is None else n
+        conf = .99 if conf is None else conf
         std_val = None
-        self.endow_eff = (
-                        (self.exog_f_mean - self.exog_s_mean)
-                        @ self._s_model.params)
-        self.coef_eff = self.exog_s_mean @ (self._f_model.params
-                                            - self._s_model.params)
-        self.int_eff = ((self.exog_f_mean - self.exog_s_mean)
-                        @ (self._f_model.params - self._s_model.params))
+        self.endow_eff, self.coef_eff, self.int_eff = _three_fold(
+                                    self.exog_f_mean, self.exog_s_mean,
+                                    self._f_params, self._s_params)
 
+        std_task = None
         if std is True:
-            std_val = self.variance(3)
+            std_val = self.variance(3, n, conf, vce, d, m)
+        elif std == 'lazy':
+            std_task = self._std_task(3, n, conf, vce, d, m)
 
         return OaxacaResults(
                             (self.endow_eff, self.coef_eff,
-                                self.int_eff, self.gap), 3, std_val=std_val)
+                                self.int_eff, self.gap), 3, std_val=std_val,
+                            fixed_effects=self._fixed_effects(
+                                self.endow_eff, self.coef_eff, self.int_eff),
+                            std_task=std_task)
 
     def two_fold(
                 self, std=False, two_fold_type='pooled',
-                submitted_weight=None, n=None, conf=None):
+                submitted_weight=None, n=None, conf=None, vce='bootstrap',
+                d=1, m=None):
         """
         Calculates the two-fold or pooled Oaxaca Blinder Decompositions
 
         Methods
         -------
-        std: boolean, optional
+        std: boolean or 'lazy', optional
             If true, bootstrapped standard errors will be calculated.
+            If 'lazy', the results are returned at once and the standard
+            errors are calculated in the background when first needed,
+            see OaxacaResults.
 
         two_fold_type: string, optional
             This method allows for the specific calculation of the
@@ -387,63 +1863,387 @@ class OaxacaBlinder(object):
             calculation. Defaults to .99, but could be anything less
             than or equal to one. One is heavy discouraged, due to the
             extreme outliers inflating the variance.
+        vce: string, optional
+            The variance estimator, like the vce option of STATA.
+            bootstrap is assumed, stratified resamples within each group
+            so the group sizes are fixed, like the STATA default.
+            jackknife uses closed-form deletion updates of the fitted
+            models instead of refitting them. subsample draws n subsamples of m rows without replacement,
+            stratified by group, and rescales their spread to the full
+            sample, so the cost scales with m instead of the rows.
+        d: int, optional
+            The number of rows deleted in each jackknife replicate. The
+            rows are randomly split into blocks of about d rows for the
+            delete-d grouped jackknife. Defaults to 1.
+        m: int, optional
+            The subsample size of vce='subsample', split over the groups
+            in proportion to their sizes. Defaults to the number of rows
+            to the power 2/3.
 
         Returns
         -------
         OaxacaResults
             A results container for the two-fold decomposition.
         """
+        self._check_two_groups()
         self.submitted_n = n
         self.submitted_conf = conf
         std_val = None
         self.two_fold_type = two_fold_type
         self.submitted_weight = submitted_weight
+        n = 5000 if n is None else n
+        conf = .99 if conf is None else conf
 
         if two_fold_type == 'cotton':
-            submitted_weight = [self.len_f / (self.len_f + self.len_s),
-                                self.len_s / (self.len_f + self.len_s)]
             self.t_params = (
                             (self.len_f / (self.len_f + self.len_s)
-                                * self._f_model.params)
+                                * self._f_params)
                             + (self.len_s / (self.len_f + self.len_s)
-                                * self._s_model.params))
+                                * self._s_params))
 
         elif two_fold_type == 'reimers':
-            submitted_weight = [.5, .5]
-            self.t_params = .5 * (self._f_model.params)  + .5 *  (self._s_model.params)
+            self.t_params = .5 * (self._f_params + self._s_params)
 
         elif two_fold_type == 'self_submitted':
             if submitted_weight is None:
                 raise ValueError('Please submit weights')
-            submitted_weight = [submitted_weight, 1 - submitted_weight]
             self.t_params = (
-                            submitted_weight[0] * self._f_model.params
-                            + submitted_weight[1] * self._s_model.params)
+                            submitted_weight * self._f_params
+                            + (1 - submitted_weight) * self._s_params)
 
         elif two_fold_type == 'nuemark':
-            self._t_model = OLS(self.endog, self.neumark).fit(
-                        cov_type=self.cov_type,
-                        cov_kwds=self.cov_kwds)
-            self.t_params = self._t_model.params
+            self._t_type = 'nuemark'
+            self.t_params = self._reference_params('nuemark')
 
         else:
-            self._t_model = OLS(self.endog, self.exog).fit(
-                                    cov_type=self.cov_type,
-                                    cov_kwds=self.cov_kwds)
-            self.t_params = np.delete(self._t_model.params, self.bifurcate)
+            self._t_type = 'pooled'
+            self.t_params = self._reference_params('pooled')
 
-        self.unexplained = ((self.exog_f_mean
-                            @ (self._f_model.params - self.t_params))
-                            + (self.exog_s_mean
-                            @ (self.t_params - self._s_model.params)))
-        self.explained = (self.exog_f_mean - self.exog_s_mean) @ self.t_params
+        self.unexplained, self.explained = _two_fold(
+                                    self.exog_f_mean, self.exog_s_mean,
+                                    self._f_params, self._s_params,
+                                    self.t_params)
 
+        std_task = None
         if std is True:
-            std_val = self.variance(2)
+            std_val = self.variance(2, n, conf, vce, d, m, two_fold_type,
+                                    submitted_weight)
+        elif std == 'lazy':
+            std_task = self._std_task(2, n, conf, vce, d, m, two_fold_type,
+                                      submitted_weight)
 
         return OaxacaResults(
                             (self.unexplained, self.explained, self.gap),
-                            2, std_val=std_val)
+                            2, std_val=std_val,
+                            fixed_effects=self._fixed_effects(
+                                self.unexplained, self.explained),
+                            std_task=std_task)
+
+    def freeze(self):
+        """
+        A read-only snapshot of the two group decomposition
+
+        Returns
+        -------
+        OaxacaFit
+            The fitted means and params, with two_fold and three_fold
+            methods that leave it and this model untouched and can be
+            called from several threads at once.
+        """
+        self._check_two_groups()
+        return OaxacaFit(self)
+
+
+class OaxacaFit(object):
+    """
+    A frozen two group Oaxaca-Blinder decomposition
+
+    Made by OaxacaBlinder.freeze. Unlike the methods of OaxacaBlinder,
+    which keep the options of the last call on the model, two_fold and
+    three_fold only read the fitted values, take every option as an
+    argument and draw the standard errors from their own random stream.
+    A single OaxacaFit can so serve concurrent requests.
+
+    Attributes
+    ----------
+    names: list
+        The names of the regressors.
+    groups: ndarray
+        The values of bifurcate of the first and the second group.
+    gap: float
+        The difference of the endog means of the two groups.
+    exog_f_mean, exog_s_mean: ndarray
+        The regressor means of the first and the second group.
+    f_params, s_params: ndarray
+        The params of the first and the second group.
+    len_f, len_s: int
+        The number of rows of the first and the second group.
+
+    Notes
+    -----
+    blas_threads caps the BLAS threads while the standard errors are
+    calculated, which needs threadpoolctl. The cap is process wide, while
+    capped calls overlap the smallest cap holds.
+    """
+    __slots__ = ('_model', '_references', 'names', 'groups', 'gap',
+                 'exog_f_mean', 'exog_s_mean', 'f_params', 's_params',
+                 'len_f', 'len_s')
+
+    def __init__(self, model):
+        def frozen(arr):
+            arr = np.array(arr)
+            arr.flags.writeable = False
+            return arr
+
+        # everything the methods read is filled in now, so no call writes
+        # to the model later
+        model._group_rows
+        references = {name: frozen(model._reference_params(name))
+                      for name in ('pooled', 'nuemark')}
+        values = {'_model': model, '_references': references,
+                  'names': list(model._names),
+                  'groups': frozen(model.bi[:2]), 'gap': float(model.gap),
+                  'exog_f_mean': frozen(model.exog_f_mean),
+                  'exog_s_mean': frozen(model.exog_s_mean),
+                  'f_params': frozen(model._f_params),
+                  's_params': frozen(model._s_params),
+                  'len_f': int(model.len_f), 'len_s': int(model.len_s)}
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('OaxacaFit is read-only')
+
+    def _results(self, effects, decomp_type, std, n, conf, vce, d, m, seed,
+                 blas_threads, two_fold_type=None, submitted_weight=None):
+        std_val = None
+        if std:
+            rng = np.random.RandomState(seed)
+            with _blas_threads(blas_threads):
+                std_val = self._model.variance(
+                                decomp_type, n, conf, vce, d, m,
+                                two_fold_type, submitted_weight, rng=rng)
+        fixed_effects = None
+        if self._model.absorb is not None:
+            fixed_effects = self.gap - sum(effects)
+        return OaxacaResults(tuple(effects) + (self.gap,), decomp_type,
+                             std_val=std_val, fixed_effects=fixed_effects)
+
+    def three_fold(self, std=False, n=5000, conf=.99, vce='bootstrap', d=1,
+                   m=None, seed=None, blas_threads=None):
+        """
+        Calculates the three-fold Oaxaca Blinder Decompositions
+
+        Parameters
+        ----------
+        std: boolean, optional
+            If true, bootstrapped standard errors will be calculated.
+        n, conf, vce, d, m: optional
+            See OaxacaBlinder.three_fold.
+        seed: int, optional
+            The seed of the random stream of the standard errors, for
+            repeatable results. A fresh stream is used by default.
+        blas_threads: int, optional
+            The most BLAS threads used for the standard errors, see Notes.
+
+        Returns
+        -------
+        OaxacaResults
+            A results container for the three-fold decomposition.
+        """
+        effects = _three_fold(self.exog_f_mean, self.exog_s_mean,
+                              self.f_params, self.s_params)
+        return self._results(effects, 3, std, n, conf, vce, d, m, seed,
+                             blas_threads)
+
+    def two_fold(self, std=False, two_fold_type='pooled',
+                 submitted_weight=None, n=5000, conf=.99, vce='bootstrap',
+                 d=1, m=None, seed=None, blas_threads=None):
+        """
+        Calculates the two-fold or pooled Oaxaca Blinder Decompositions
+
+        Parameters
+        ----------
+        std: boolean, optional
+            If true, bootstrapped standard errors will be calculated.
+        two_fold_type, submitted_weight, n, conf, vce, d, m: optional
+            See OaxacaBlinder.two_fold.
+        seed: int, optional
+            The seed of the random stream of the standard errors, for
+            repeatable results. A fresh stream is used by default.
+        blas_threads: int, optional
+            The most BLAS threads used for the standard errors, see Notes.
+
+        Returns
+        -------
+        OaxacaResults
+            A results container for the two-fold decomposition.
+        """
+        if two_fold_type in ('cotton', 'reimers', 'self_submitted'):
+            if two_fold_type == 'self_submitted' and submitted_weight is None:
+                raise ValueError('Please submit weights')
+            t_params = _weighted_params(two_fold_type, self.f_params,
+                                        self.s_params, self.len_f,
+                                        self.len_s, submitted_weight)
+        elif two_fold_type == 'nuemark':
+            t_params = self._references['nuemark']
+        else:
+            two_fold_type = 'pooled'
+            t_params = self._references['pooled']
+        effects = _two_fold(self.exog_f_mean, self.exog_s_mean,
+                            self.f_params, self.s_params, t_params)
+        return self._results(effects, 2, std, n, conf, vce, d, m, seed,
+                             blas_threads, two_fold_type, submitted_weight)
+
+
+class OaxacaPartial(object):
+    """
+    The partial state of an Oaxaca-Blinder decomposition of one shard
+
+    Holds the counts, sums and cross products of each group in a shard of
+    the data. Partial states of different shards are combined with merge,
+    in any order and grouping, and finalize gives the decomposition of
+    all of the data they were built from.
+
+    Parameters
+    ----------
+    groups: array_like
+        The sorted values of the bifurcate column in the shard.
+    moments: _GroupMoments
+        The moments of each group, in the order of groups.
+    names: list of str
+        The names of the regressors.
+
+    Notes
+    -----
+    Use OaxacaPartial.from_data to build a partial state. Partial states
+    pickle and to_bytes gives a compact form without pickle, so they can
+    be sent between processes or machines.
+
+    Examples
+    --------
+    >>> parts = [OaxacaPartial.from_data(y, x, 3) for y, x in shards]
+    >>> total = parts[0]
+    >>> for part in parts[1:]:
+    ...     total = total.merge(part)
+    >>> total.finalize(2).summary()
+    """
+    def __init__(self, groups, moments, names):
+        self.groups = np.asarray(groups)
+        self.moments = moments
+        self.names = list(names)
+
+    @classmethod
+    def from_data(cls, endog, exog, bifurcate, hasconst=True,
+                  blocksize=_BLOCKSIZE):
+        """
+        Builds the partial state of a shard
+
+        The arguments are as in OaxacaBlinder, exog can be a pandas
+        DataFrame, an Arrow table or an array. Every shard has to be
+        given with the same columns. Absorbed effects are not supported,
+        as the demeaned moments of shards do not add up.
+        """
+        endog, exog, names, bifurcate, _ = _resolve_data(endog, exog,
+                                                         bifurcate)
+        del names[bifurcate]
+        if hasconst is False:
+            names.append('const')
+        groups = np.unique(exog[:, bifurcate])
+        return cls(groups, _GroupMoments.from_data(
+                                endog, exog, bifurcate, groups, hasconst,
+                                blocksize=blocksize), names)
+
+    def merge(self, other):
+        """
+        Combines two partial states into that of both of their shards
+
+        Returns a new OaxacaPartial, neither state is changed.
+        """
+        if self.names != other.names:
+            raise ValueError('The partial states have different columns')
+        groups = np.union1d(self.groups, other.groups)
+        arrays = []
+        for name in _GroupMoments.names:
+            value = getattr(self.moments, name)
+            total = np.zeros((len(groups),) + value.shape[1:])
+            total[np.searchsorted(groups, self.groups)] += value
+            total[np.searchsorted(groups, other.groups)] += getattr(
+                                                    other.moments, name)
+            arrays.append(total)
+        return OaxacaPartial(groups, _GroupMoments(*arrays), self.names)
+
+    def finalize(self, decomp_type=2, two_fold_type='pooled',
+                 submitted_weight=None, swap=True):
+        """
+        The decomposition of the merged data
+
+        Parameters
+        ----------
+        decomp_type: int, optional
+            2 for the two-fold decomposition, 3 for the three-fold one.
+        two_fold_type: string, optional
+            The non-discriminatory model of the two-fold decomposition, as
+            in OaxacaBlinder.two_fold.
+        submitted_weight: float, required only for self_submitted
+            The weight of the larger mean group.
+        swap: bool, optional
+            Swaps the groups so the gap is positive, as in OaxacaBlinder.
+
+        Returns
+        -------
+        OaxacaResults
+            The same results as OaxacaBlinder on all of the data, without
+            standard errors as these need the rows.
+        """
+        if len(self.groups) != 2:
+            raise ValueError('There must be exactly two groups, found {}'
+                             .format(len(self.groups)))
+        means, endog_means = self.moments.means()
+        params = self.moments.params(self.names)
+        first, second = 0, 1
+        if swap and endog_means[0] < endog_means[1]:
+            first, second = 1, 0
+        gap = endog_means[first] - endog_means[second]
+        if decomp_type == 3:
+            return OaxacaResults(_three_fold(
+                                means[first], means[second],
+                                params[first], params[second]) + (gap,), 3)
+        if two_fold_type in ('cotton', 'reimers', 'self_submitted'):
+            if two_fold_type == 'self_submitted' and submitted_weight is None:
+                raise ValueError('Please submit weights')
+            t_params = _weighted_params(
+                                two_fold_type, params[first], params[second],
+                                self.moments.nobs[first],
+                                self.moments.nobs[second], submitted_weight)
+        else:
+            t_params = self.moments.pooled_params(
+                                [0, 1], self.groups, self.names,
+                                two_fold_type != 'nuemark')
+        return OaxacaResults(_two_fold(
+                                means[first], means[second], params[first],
+                                params[second], t_params) + (gap,), 2)
+
+    def to_bytes(self):
+        """
+        The partial state as bytes, read back with OaxacaPartial.from_bytes
+        """
+        buffer = io.BytesIO()
+        np.savez(buffer, groups=self.groups, names=np.array(self.names),
+                 **{name: getattr(self.moments, name)
+                    for name in _GroupMoments.names})
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Reads a partial state written by to_bytes
+        """
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(arrays['groups'], _GroupMoments(
+                                *[arrays[name]
+                                  for name in _GroupMoments.names]),
+                       arrays['names'].tolist())
 
 
 class OaxacaResults:
@@ -493,20 +2293,123 @@ class OaxacaResults:
     params
         A list of all values for the fitted models.
     std
-        A list of standard error calculations.
+        A list of standard error calculations. With std='lazy', reading
+        it starts the computation if needed and waits for it.
+    fixed_effects
+        The combined contribution of the absorbed effects to the gap, the
+        effects above then only cover the other covariates. None if no
+        effects were absorbed.
+
+    Notes
+    -----
+    With std='lazy' in two_fold or three_fold the results are returned
+    with the point estimates only. std_future() starts the standard
+    errors on a background thread and returns a Future, std_progress()
+    reads the share of replicates done and cancel_std() stops them. The
+    standard errors are kept once they are done.
     """
-    def __init__(self, results, model_type, std_val=None):
+    def __init__(self, results, model_type, std_val=None,
+                 fixed_effects=None, std_task=None):
         self.params = results
-        self.std = std_val
+        self._std = std_val
+        self._std_task = std_task
+        self._std_future = None
+        self._progress = None
+        self._lock = threading.Lock()
         self.model_type = model_type
+        self.fixed_effects = fixed_effects
+
+    @property
+    def std(self):
+        if self._std is None and self._std_task is not None:
+            self._std = self.std_future().result()
+        return self._std
 
-    def summary(self):
+    @std.setter
+    def std(self, std_val):
+        self._std = std_val
+
+    def std_future(self):
+        """
+        Starts the lazy standard errors if they are not running yet
+
+        Returns
+        -------
+        concurrent.futures.Future
+            The future of the list of standard errors. It is cancelled by
+            cancel_std, a later call then starts over.
+        """
+        with self._lock:
+            if self._std_future is None:
+                future = Future()
+                if self._std is not None or self._std_task is None:
+                    future.set_result(self._std)
+                    return future
+                progress = _Progress()
+
+                def run():
+                    std_val, error = None, None
+                    try:
+                        std_val = self._std_task(progress)
+                    except CancelledError:
+                        return
+                    except Exception as err:
+                        error = err
+                    with self._lock:
+                        if future.cancelled():
+                            return
+                        if error is not None:
+                            future.set_exception(error)
+                        else:
+                            self._std = std_val
+                            future.set_result(std_val)
+
+                self._std_future, self._progress = future, progress
+                threading.Thread(target=run, daemon=True).start()
+            return self._std_future
+
+    def std_progress(self):
+        """
+        The share of the replicates of the lazy standard errors that are
+        done, from 0 to 1
+        """
+        if self._std is not None:
+            return 1.
+        progress = self._progress
+        if progress is None or not progress.total:
+            return 0.
+        return progress.done / progress.total
+
+    def cancel_std(self):
+        """
+        Stops the lazy standard errors, returns whether they were running
+        """
+        with self._lock:
+            future, self._std_future = self._std_future, None
+            if future is None or future.done():
+                return False
+            self._progress.cancelled.set()
+            self._progress = None
+            return future.cancel()
+
+    def summary(self, print_out=True):
         """
         Print a summary table with the Oaxaca-Blinder effects
+
+        Parameters
+        ----------
+        print_out: bool, optional
+            If False, the table is only returned, not printed.
+
+        Returns
+        -------
+        str
+            The summary table.
         """
+        lines = []
         if self.model_type == 2:
             if self.std is None:
-                print(dedent("""\
+                lines.append(dedent("""\
                 Oaxaca-Blinder Two-fold Effects
                 Unexplained Effect: {:.5f}
                 Explained Effect: {:.5f}
@@ -514,7 +2417,7 @@ class OaxacaResults:
                                     self.params[0], self.params[1],
                                     self.params[2])))
             else:
-                print(dedent("""\
+                lines.append(dedent("""\
                 Oaxaca-Blinder Two-fold Effects
                 Unexplained Effect: {:.5f}
                 Unexplained Standard Error: {:.5f}
@@ -526,7 +2429,7 @@ class OaxacaResults:
                                     self.params[2])))
         if self.model_type == 3:
             if self.std is None:
-                print(dedent("""\
+                lines.append(dedent("""\
                 Oaxaca-Blinder Three-fold Effects
                 Endowment Effect: {:.5f}
                 Coefficient Effect: {:.5f}
@@ -535,7 +2438,7 @@ class OaxacaResults:
                                 self.params[0], self.params[1],
                                 self.params[2], self.params[3])))
             else:
-                print(dedent("""\
+                lines.append(dedent("""\
                 Oaxaca-Blinder Three-fold Effects
                 Endowment Effect: {:.5f}
                 Endowment Standard Error: {:.5f}
@@ -548,3 +2451,550 @@ class OaxacaResults:
                                 self.params[1], self.std[1],
                                 self.params[2], self.std[2],
                                 self.params[3])))
+        if self.fixed_effects is not None:
+            lines.append('Fixed Effects: {:.5f}'.format(self.fixed_effects))
+        text = '\n'.join(lines)
+        if print_out:
+            print(text)
+        return text
+
+
+class OaxacaPairwiseResults:
+    """
+    This class summarizes the pairwise fits of the OaxacaBlinder model.
+
+    Use .summary() to get a table of each effect or
+    use .params to receive a list of the G x G effect arrays
+    use .get(first, second) to receive the OaxacaResults of one pair
+
+    Entry [i, j] of each array is the decomposition of groups[i]
+    against groups[j], with groups[i] as the first group. The effects
+    are in the same order as in OaxacaResults.
+
+    Attributes
+    ----------
+    params
+        A list of G x G arrays of the effects.
+    groups
+        The values of the bifurcate column, in the order of the arrays.
+    fixed_effects
+        The G x G array of the contributions of the absorbed effects to
+        the gaps, None if no effects were absorbed.
+    """
+    def __init__(self, results, model_type, groups, fixed_effects=None):
+        self.params = results
+        self.model_type = model_type
+        self.groups = groups
+        self.fixed_effects = fixed_effects
+
+    def get(self, first, second):
+        """
+        Returns the OaxacaResults of first against second
+        """
+        i = np.where(self.groups == first)[0][0]
+        j = np.where(self.groups == second)[0][0]
+        fixed_effects = None
+        if self.fixed_effects is not None:
+            fixed_effects = self.fixed_effects[i, j]
+        return OaxacaResults(
+                        tuple(eff[i, j] for eff in self.params),
+                        self.model_type, fixed_effects=fixed_effects)
+
+    def summary(self, print_out=True):
+        """
+        Print a summary table with the pairwise Oaxaca-Blinder effects
+
+        Parameters
+        ----------
+        print_out: bool, optional
+            If False, the table is only returned, not printed.
+
+        Returns
+        -------
+        str
+            The summary table.
+        """
+        lines = []
+        if self.model_type == 2:
+            names = ('Unexplained Effect', 'Explained Effect', 'Gap')
+            lines.append('Oaxaca-Blinder Pairwise Two-fold Effects')
+        else:
+            names = ('Endowment Effect', 'Coefficient Effect',
+                     'Interaction Effect', 'Gap')
+            lines.append('Oaxaca-Blinder Pairwise Three-fold Effects')
+        labels = [str(group) for group in self.groups]
+        width = max(12, max(len(label) for label in labels) + 2)
+        effects = list(self.params)
+        if self.fixed_effects is not None:
+            names = names + ('Fixed Effects',)
+            effects.append(self.fixed_effects)
+        for name, eff in zip(names, effects):
+            lines.append(name)
+            lines.append(''.rjust(width) + ''.join(label.rjust(width)
+                                           for label in labels))
+            for label, row in zip(labels, eff):
+                lines.append(label.rjust(width) + ''.join(
+                    '{:.5f}'.format(val).rjust(width) for val in row))
+        text = '\n'.join(lines)
+        if print_out:
+            print(text)
+        return text
+
+
+class OaxacaSweepResults:
+    """
+    This class summarizes a weight sweep of the OaxacaBlinder model.
+
+    Use .summary() to get a table of the effects for every weight or
+    use .params to receive a list of the effects
+    use .std to receive a list of the standard errors
+    use .bands to receive the bootstrapped bands
+
+    The params are the unexplained effects and the explained effects,
+    both arrays over the weights, and the mean gap, which does not
+    depend on the weight.
+
+    Attributes
+    ----------
+    weights
+        The weights of the larger mean group.
+    params
+        A list of the effects.
+    std
+        A list of the standard errors of the unexplained and explained
+        effects, arrays over the weights.
+    bands
+        A list of the (lower, upper) bounds of the unexplained and
+        explained effects, the extremes of the trimmed resamples.
+    fixed_effects
+        The contribution of the absorbed effects to the gap, the same for
+        every weight. None if no effects were absorbed.
+    """
+    def __init__(self, weights, results, std_val=None, bands=None,
+                 fixed_effects=None):
+        self.weights = weights
+        self.params = results
+        self.std = std_val
+        self.bands = bands
+        self.fixed_effects = fixed_effects
+
+    def summary(self, print_out=True):
+        """
+        Print a summary table with the effects for every weight
+
+        Parameters
+        ----------
+        print_out: bool, optional
+            If False, the table is only returned, not printed.
+
+        Returns
+        -------
+        str
+            The summary table.
+        """
+        lines = []
+        lines.append('Oaxaca-Blinder Two-fold Weight Sweep')
+        lines.append('Gap: {:.5f}'.format(self.params[2]))
+        if self.fixed_effects is not None:
+            lines.append('Fixed Effects: {:.5f}'.format(self.fixed_effects))
+        if self.std is None:
+            lines.append('{:>8} {:>14} {:>14}'.format(
+                            'Weight', 'Unexplained', 'Explained'))
+            for row in zip(self.weights, *self.params[:2]):
+                lines.append('{:>8.3f} {:>14.5f} {:>14.5f}'.format(*row))
+        else:
+            lines.append('{:>8} {:>14} {:>14} {:>14} {:>14}'.format(
+                            'Weight', 'Unexplained', 'Std. Error',
+                            'Explained', 'Std. Error'))
+            for row in zip(self.weights, self.params[0], self.std[0],
+                           self.params[1], self.std[1]):
+                lines.append('{:>8.3f} {:>14.5f} {:>14.5f} {:>14.5f} '
+                      '{:>14.5f}'.format(*row))
+        text = '\n'.join(lines)
+        if print_out:
+            print(text)
+        return text
+
+
+class OaxacaScenarioResults:
+    """
+    This class summarizes counterfactual scenarios of the OaxacaBlinder
+    model.
+
+    Use .summary() to get a table of the effects for every scenario or
+    use .params to receive a list of the effects
+    use .std to receive a list of the standard errors
+    use .bands to receive the bootstrapped bands
+
+    The params are the effects in the same order as in OaxacaResults,
+    each an array over the scenarios. The gap is that of the fitted means
+    under each scenario.
+
+    Attributes
+    ----------
+    scenarios
+        The counterfactual means or shifts, one row per scenario.
+    params
+        A list of the effects.
+    std
+        A list of the standard errors of the effects and the gap, arrays
+        over the scenarios.
+    bands
+        A list of the (lower, upper) bounds of the effects, the extremes
+        of the trimmed resamples.
+    """
+    def __init__(self, scenarios, results, model_type, std_val=None,
+                 bands=None):
+        self.scenarios = scenarios
+        self.params = results
+        self.model_type = model_type
+        self.std = std_val
+        self.bands = bands
+
+    def summary(self, print_out=True):
+        """
+        Print a summary table with the effects for every scenario
+
+        Parameters
+        ----------
+        print_out: bool, optional
+            If False, the table is only returned, not printed.
+
+        Returns
+        -------
+        str
+            The summary table.
+        """
+        lines = []
+        if self.model_type == 2:
+            names = ['Unexplained', 'Explained', 'Gap']
+            lines.append('Oaxaca-Blinder Two-fold Scenarios')
+        else:
+            names = ['Endowment', 'Coefficient', 'Interaction', 'Gap']
+            lines.append('Oaxaca-Blinder Three-fold Scenarios')
+        columns = list(self.params)
+        if self.std is not None:
+            names = [label for name in names
+                     for label in (name, 'Std. Error')]
+            columns = [col for pair in zip(self.params, self.std)
+                       for col in pair]
+        lines.append('{:>8}'.format('Scenario') + ''.join(
+                        ' {:>14}'.format(name) for name in names))
+        for i, row in enumerate(zip(*columns)):
+            lines.append('{:>8}'.format(i) + ''.join(
+                        ' {:>14.5f}'.format(val) for val in row))
+        text = '\n'.join(lines)
+        if print_out:
+            print(text)
+        return text
+
+
+class OaxacaSpecResults:
+    """
+    This class summarizes a specification search of the OaxacaBlinder
+    model.
+
+    Use .summary() to get a table of the effects for every specification
+    or use .params to receive a list of the effects
+
+    The params are the effects in the same order as in OaxacaResults,
+    each an array over the specifications, and the mean gap, which is
+    the same for all of them.
+
+    Attributes
+    ----------
+    labels
+        The labels of the specifications.
+    params
+        A list of the effects.
+    """
+    def __init__(self, labels, results, model_type):
+        self.labels = labels
+        self.params = results
+        self.model_type = model_type
+
+    def summary(self, print_out=True):
+        """
+        Print a summary table with the effects for every specification
+
+        Parameters
+        ----------
+        print_out: bool, optional
+            If False, the table is only returned, not printed.
+
+        Returns
+        -------
+        str
+            The summary table.
+        """
+        lines = []
+        if self.model_type == 2:
+            names = ['Unexplained', 'Explained']
+            lines.append('Oaxaca-Blinder Two-fold Specifications')
+        else:
+            names = ['Endowment', 'Coefficient', 'Interaction']
+            lines.append('Oaxaca-Blinder Three-fold Specifications')
+        lines.append('Gap: {:.5f}'.format(self.params[-1]))
+        width = max([13] + [len(label) for label in self.labels])
+        lines.append('Specification'.ljust(width) + ''.join(
+                        ' {:>14}'.format(name) for name in names))
+        for label, row in zip(self.labels, zip(*self.params[:-1])):
+            lines.append(label.ljust(width) + ''.join(
+                        ' {:>14.5f}'.format(val) for val in row))
+        text = '\n'.join(lines)
+        if print_out:
+            print(text)
+        return text
+
+class OaxacaBatchResults:
+    """
+    This class collects many decompositions as typed columns.
+
+    Use .append(model) to run and add a decomposition or
+    use .add(results) to add the OaxacaResults of one
+    use .columns to receive a dict of the NumPy columns
+    use .to_pandas(), .to_arrow() or .to_parquet(path) to export them
+
+    Every decomposition is one row. The effects that do not apply to
+    its type, like the explained effect of a three-fold decomposition,
+    and the standard errors that were not calculated are NaN. Nothing
+    is kept as Python objects per row, so hundreds of thousands of
+    decompositions stay cheap to collect and export.
+
+    Attributes
+    ----------
+    columns
+        A dict of the columns, views of the first len(self) rows:
+
+        label: codes into labels, int8 and widened to int16 or int32
+        once there are more labels, the dtype pandas picks for them.
+        two_fold_type: int8 codes into two_fold_types, -1 for three-fold
+        rows.
+        decomp_type: int8, 2 or 3.
+        group_f, group_s: float64, the values of bifurcate of the first
+        and the second group.
+        nobs_f, nobs_s: int64, the rows of the two groups.
+        unexplained, explained, endowment, coefficient, interaction,
+        gap, fixed_effects: float64, the effects.
+        std_unexplained, std_explained, std_endowment, std_coefficient,
+        std_interaction: float64, the standard errors.
+        seconds: float64, the time spent on the decomposition.
+    labels
+        The labels of the rows, e.g. segment or outcome names.
+    two_fold_types
+        The reference types of the two_fold_type codes.
+
+    Notes
+    -----
+    The columns grow by doubling. to_pandas and to_arrow wrap the
+    columns without copying them, label and two_fold_type become
+    categorical and dictionary columns over the same codes. Rows added
+    later are not seen by earlier exports, but the exports share memory
+    with the container until it next grows.
+    """
+    two_fold_types = ('pooled', 'nuemark', 'cotton', 'reimers',
+                      'self_submitted')
+    _effects = {2: ('unexplained', 'explained'),
+                3: ('endowment', 'coefficient', 'interaction')}
+    _dtypes = dict(
+        [('label', np.int8), ('decomp_type', np.int8),
+         ('two_fold_type', np.int8), ('group_f', np.float64),
+         ('group_s', np.float64), ('nobs_f', np.int64),
+         ('nobs_s', np.int64)]
+        + [(name, np.float64) for name in
+           _effects[2] + _effects[3] + ('gap', 'fixed_effects')]
+        + [('std_' + name, np.float64) for name in
+           _effects[2] + _effects[3]]
+        + [('seconds', np.float64)])
+
+    def __init__(self, capacity=1024):
+        self.labels = []
+        self._label_codes = {}
+        self._len = 0
+        self._data = {name: np.empty(capacity, dtype)
+                      for name, dtype in self._dtypes.items()}
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def columns(self):
+        return {name: arr[:self._len] for name, arr in self._data.items()}
+
+    def _row(self):
+        # the index of a new row, doubling the columns when they are full
+        if self._len == len(self._data['label']):
+            size = max(2 * self._len, 1)
+            for name, arr in self._data.items():
+                grown = np.empty(size, arr.dtype)
+                grown[:self._len] = arr
+                self._data[name] = grown
+        self._len += 1
+        return self._len - 1
+
+    def add(self, results, label='', groups=(np.nan, np.nan),
+            nobs=(0, 0), two_fold_type='pooled', seconds=np.nan):
+        """
+        Adds the OaxacaResults of one decomposition as a row
+
+        Parameters
+        ----------
+        results: OaxacaResults
+            The decomposition. Lazy standard errors that are not done yet
+            are not waited for, they are NaN.
+        label: string, optional
+            The label of the row.
+        groups: tuple, optional
+            The values of bifurcate of the first and the second group.
+        nobs: tuple, optional
+            The rows of the first and the second group.
+        two_fold_type: string, optional
+            The reference type of a two-fold decomposition.
+        seconds: float, optional
+            The time spent on the decomposition.
+        """
+        i = self._row()
+        data = self._data
+        label = str(label)
+        if label not in self._label_codes:
+            self._label_codes[label] = len(self.labels)
+            self.labels.append(label)
+            codes = data['label']
+            if len(self.labels) >= np.iinfo(codes.dtype).max:
+                # widened like pandas does, so its categorical keeps
+                # sharing the codes
+                data['label'] = codes.astype(
+                                np.int16 if codes.dtype == np.int8
+                                else np.int32)
+        data['label'][i] = self._label_codes[label]
+        decomp_type = results.model_type
+        data['decomp_type'][i] = decomp_type
+        data['two_fold_type'][i] = -1
+        if decomp_type == 2:
+            data['two_fold_type'][i] = (
+                    self.two_fold_types.index(two_fold_type)
+                    if two_fold_type in self.two_fold_types else 0)
+        data['group_f'][i], data['group_s'][i] = groups
+        data['nobs_f'][i], data['nobs_s'][i] = nobs
+        for name in self._effects[2] + self._effects[3]:
+            data[name][i] = data['std_' + name][i] = np.nan
+        names = self._effects[decomp_type]
+        for name, value in zip(names, results.params):
+            data[name][i] = value
+        # reading std would wait for lazy standard errors
+        if results._std is not None:
+            for name, value in zip(names, results._std):
+                data['std_' + name][i] = value
+        data['gap'][i] = results.params[-1]
+        data['fixed_effects'][i] = (np.nan if results.fixed_effects is None
+                                    else results.fixed_effects)
+        data['seconds'][i] = seconds
+
+    def append(self, model, label='', decomp_type=2, **kwds):
+        """
+        Runs one decomposition of model and adds it as a row
+
+        Parameters
+        ----------
+        model: OaxacaBlinder or OaxacaFit
+            A model of two groups.
+        label: string, optional
+            The label of the row.
+        decomp_type: int, optional
+            2 for two_fold, the default, or 3 for three_fold.
+        **kwds
+            Passed on to two_fold or three_fold.
+
+        Returns
+        -------
+        OaxacaResults
+            The results of the decomposition.
+        """
+        start = time.perf_counter()
+        if decomp_type == 3:
+            results = model.three_fold(**kwds)
+        else:
+            results = model.two_fold(**kwds)
+        seconds = time.perf_counter() - start
+        if isinstance(model, OaxacaFit):
+            groups = model.groups
+        else:
+            groups = model.bi[:2]
+        self.add(results, label, groups, (model.len_f, model.len_s),
+                 kwds.get('two_fold_type', 'pooled'), seconds)
+        return results
+
+    def to_pandas(self):
+        """
+        A pandas DataFrame of the columns, without copying them
+        """
+        import pandas as pd
+        columns = self.columns
+        columns['label'] = pd.Categorical.from_codes(
+                                columns['label'], self.labels,
+                                validate=False)
+        columns['two_fold_type'] = pd.Categorical.from_codes(
+                                columns['two_fold_type'],
+                                self.two_fold_types, validate=False)
+        return pd.DataFrame(columns, copy=False)
+
+    def to_arrow(self):
+        """
+        An Arrow table of the columns, without copying them
+        """
+        import pyarrow as pa
+        columns = {name: pa.array(arr) for name, arr in self.columns.items()}
+        columns['label'] = pa.DictionaryArray.from_arrays(
+                                columns['label'],
+                                pa.array(self.labels, pa.string()))
+        codes = self.columns['two_fold_type']
+        columns['two_fold_type'] = pa.DictionaryArray.from_arrays(
+                                pa.array(codes, mask=codes < 0),
+                                pa.array(self.two_fold_types))
+        return pa.table(columns)
+
+    def to_parquet(self, path, **kwds):
+        """
+        Writes the columns to a Parquet file
+
+        Parameters
+        ----------
+        path: string
+            The path of the file.
+        **kwds
+            Passed on to pyarrow.parquet.write_table, e.g. compression.
+        """
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path, **kwds)
+
+    def summary(self, print_out=True):
+        """
+        Print a summary table with the effects of every row
+
+        Parameters
+        ----------
+        print_out: bool, optional
+            If False, the table is only returned, not printed.
+
+        Returns
+        -------
+        str
+            The summary table.
+        """
+        names = self._effects[2] + self._effects[3] + ('gap',)
+        width = max([5] + [len(str(label)) for label in self.labels])
+        lines = ['Oaxaca-Blinder Batch of {} Decompositions'.format(
+                                                            self._len),
+                 'Label'.ljust(width) + ' Type' + ''.join(
+                        ' {:>14}'.format(name.capitalize())
+                        for name in names)]
+        columns = self.columns
+        for i in range(self._len):
+            lines.append(str(self.labels[columns['label'][i]]).ljust(width)
+                         + ' {:>4}'.format(columns['decomp_type'][i])
+                         + ''.join(' {:>14.5f}'.format(columns[name][i])
+                                   for name in names))
+        text = '\n'.join(lines)
+        if print_out:
+            print(text)
+        return text
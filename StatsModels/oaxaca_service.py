@@ -0,0 +1,251 @@
+"""
+Author: Austin Adams
+
+A small local HTTP service around OaxacaBlinder.
+
+Registered datasets are fitted once and kept in memory, so a request only
+pays for its decomposition. Concurrent requests against the same dataset
+are coalesced into one batch that is run on a worker pool, which keeps
+the event loop free while bootstraps run. Identical requests in a batch
+are computed once and every standard error request of a batch shares the
+bootstrap replicates of the model.
+
+The service only uses the standard library and speaks JSON over HTTP/1.1:
+
+POST /datasets/<name>
+    {"endog": [...], "exog": [[...], ...], "bifurcate": 3, ...}
+    Registers a dataset, any other keys are passed to OaxacaBlinder.
+GET /datasets
+    Lists the registered datasets.
+POST /decompose/<name>
+    {"decomp": "two_fold", "two_fold_type": "cotton", "std": true, ...}
+    decomp is two_fold, three_fold or pairwise and the other keys are
+    passed to that method. Returns {"params": [...], "std": [...]}, with
+    null for values that are not defined, like pairs without the
+    reference group.
+
+Bad requests are answered with 400 and failed decompositions with 500,
+both with {"error": "..."}.
+
+Examples
+--------
+>>> service = OaxacaService()
+>>> service.register('ccard', endog, exog, 3)
+>>> service.run(port=8765)
+"""
+from statsmodels.stats.oaxaca import OaxacaBlinder
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+
+import numpy as np
+
+
+def _to_json(value):
+    """
+    Converts NumPy values and containers to plain Python for json, NaN
+    and infinite values become None as JSON has no such numbers
+    """
+    if isinstance(value, np.ndarray):
+        return _to_json(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return [_to_json(val) for val in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def _run_batch(model, requests):
+    """
+    Runs a batch of decomposition requests against one model
+
+    Each distinct request is computed once. Errors are returned in place
+    of the result of the request that raised them.
+    """
+    results = {}
+    for request in requests:
+        key = json.dumps(request, sort_keys=True)
+        if key in results:
+            continue
+        options = dict(request)
+        decomp = options.pop('decomp', 'two_fold')
+        try:
+            if decomp not in ('two_fold', 'three_fold', 'pairwise'):
+                raise ValueError('Unknown decomp {}'.format(decomp))
+            res = getattr(model, decomp)(**options)
+            results[key] = {'params': _to_json(res.params),
+                            'std': _to_json(getattr(res, 'std', None))}
+        except Exception as err:
+            results[key] = err
+    return [results[json.dumps(request, sort_keys=True)]
+            for request in requests]
+
+
+class _Dataset(object):
+    def __init__(self, model):
+        self.model = model
+        self.pending = []
+        self.running = False
+
+
+class OaxacaService(object):
+    """
+    A local asyncio HTTP service that keeps OaxacaBlinder models resident
+
+    Parameters
+    ----------
+    executor: concurrent.futures.Executor, optional
+        The worker pool the decompositions run on. Defaults to a thread
+        pool with max_workers threads.
+    max_workers: int, optional
+        The size of the default thread pool. Defaults to 4.
+    batch_window: float, optional
+        Seconds to wait for more requests against a dataset before its
+        batch is run. Defaults to .005.
+
+    Attributes
+    ----------
+    batches
+        The number of batches run, to see the coalescing at work.
+    """
+    def __init__(self, executor=None, max_workers=4, batch_window=.005):
+        self._own_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.executor = executor
+        self.batch_window = batch_window
+        self.datasets = {}
+        self.batches = 0
+
+    def register(self, name, endog, exog, bifurcate, **kwargs):
+        """
+        Fits and keeps a dataset under name, replacing any with that name
+        """
+        self.datasets[name] = _Dataset(
+                        OaxacaBlinder(endog, exog, bifurcate, **kwargs))
+
+    def close(self):
+        """
+        Shuts down the default thread pool once its work is done
+
+        An executor that was passed in is left to its owner.
+        """
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def decompose(self, name, request):
+        """
+        Adds a request to the next batch of a dataset and waits for it
+        """
+        dataset = self.datasets[name]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        dataset.pending.append((request, future))
+        if not dataset.running:
+            dataset.running = True
+            loop.create_task(self._drain(dataset))
+        return await future
+
+    async def _drain(self, dataset):
+        # runs the pending requests of a dataset in batches until there
+        # are none left, one batch at a time so the model is not shared
+        loop = asyncio.get_running_loop()
+        try:
+            while dataset.pending:
+                await asyncio.sleep(self.batch_window)
+                batch, dataset.pending = dataset.pending, []
+                self.batches += 1
+                try:
+                    results = await loop.run_in_executor(
+                                self.executor, _run_batch, dataset.model,
+                                [request for request, _ in batch])
+                except Exception as err:
+                    results = [err] * len(batch)
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        finally:
+            dataset.running = False
+
+    async def _route(self, method, path, body):
+        parts = [part for part in path.split('/') if part]
+        if method == 'GET' and parts == ['datasets']:
+            return 200, {'datasets': sorted(self.datasets)}
+        if method == 'POST' and len(parts) == 2 and parts[0] == 'datasets':
+            options = json.loads(body or b'{}')
+            endog = np.asarray(options.pop('endog'), dtype=float)
+            exog = np.asarray(options.pop('exog'), dtype=float)
+            bifurcate = options.pop('bifurcate')
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                        self.executor,
+                        lambda: self.register(parts[1], endog, exog,
+                                              bifurcate, **options))
+            return 201, {'dataset': parts[1]}
+        if method == 'POST' and len(parts) == 2 and parts[0] == 'decompose':
+            if parts[1] not in self.datasets:
+                return 404, {'error': 'Unknown dataset {}'.format(parts[1])}
+            return 200, await self.decompose(parts[1],
+                                             json.loads(body or b'{}'))
+        return 404, {'error': 'Unknown path {}'.format(path)}
+
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                method, path, _ = (
+                            await reader.readline()).decode().split(' ', 2)
+                length = 0
+                while True:
+                    line = (await reader.readline()).decode().strip()
+                    if not line:
+                        break
+                    key, _, value = line.partition(':')
+                    if key.lower() == 'content-length':
+                        length = int(value)
+                body = await reader.readexactly(length)
+            except (ValueError, asyncio.IncompleteReadError):
+                status, payload = 400, {'error': 'Malformed request'}
+            else:
+                try:
+                    status, payload = await self._route(method, path, body)
+                except (ValueError, TypeError, KeyError) as err:
+                    status, payload = 400, {'error': str(err)}
+                except Exception as err:
+                    status, payload = 500, {'error': '{}: {}'.format(
+                                            type(err).__name__, err)}
+            data = json.dumps(payload, allow_nan=False).encode()
+            writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json'
+                         '\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'
+                         .format(status, 'OK' if status < 400 else 'Error',
+                                 len(data)).encode() + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        Starts listening and returns the asyncio server
+
+        With port 0 a free port is chosen, server.sockets[0].getsockname()
+        gives the address.
+        """
+        return await asyncio.start_server(self._handle, host, port)
+
+    def run(self, host='127.0.0.1', port=8765):
+        """
+        Serves until interrupted
+        """
+        async def serve():
+            server = await self.start(host, port)
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(serve())
+        finally:
+            self.close()
@@ -4,11 +4,22 @@
 # no sense for Oaxaca. All of these stata_results
 # are from using the oaxaca command in STATA.
 
+import os
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from textwrap import dedent
+
 import numpy as np
+import pytest
 
 from statsmodels.datasets.ccard.data import load_pandas
-from statsmodels.stats.oaxaca import OaxacaBlinder
+from statsmodels.stats import oaxaca
+from statsmodels.stats.oaxaca import (OaxacaBatchResults, OaxacaBlinder,
+                                      OaxacaFit, OaxacaPartial, _three_fold,
+                                      _two_fold)
+from statsmodels.tools.sm_exceptions import CollinearityWarning
 from statsmodels.tools.tools import add_constant
+from statsmodels.regression.linear_model import OLS
 
 pandas_df = load_pandas()
 endog = pandas_df.endog.values
@@ -182,3 +193,757 @@ class TestOaxacaPandasNoSwapNoConstPassed(object):
         np.testing.assert_almost_equal(gap, stata_results_pooled[0], 3)
         np.testing.assert_almost_equal(exp, stata_results_pooled[1], 3)
         np.testing.assert_almost_equal(unexp, stata_results_pooled[2], 3)
+
+
+class TestOaxacaPairwise(object):
+    @classmethod
+    def setup_class(cls):
+        cls.groups = exog[:, 3] + 2 * (exog[:, 0] > 32)
+        cls.exog = exog.copy()
+        cls.exog[:, 3] = cls.groups
+        cls.model = OaxacaBlinder(endog, cls.exog, 3)
+
+    def pair_model(self, first, second):
+        rows = (self.groups == first) | (self.groups == second)
+        return OaxacaBlinder(endog[rows], self.exog[rows], 3, swap=False)
+
+    def test_results(self):
+        three_fold = self.model.pairwise(3)
+        for two_fold_type in ('pooled', 'nuemark', 'reimers'):
+            two_fold = self.model.pairwise(two_fold_type=two_fold_type)
+            for first, second in ((0, 1), (0, 3), (1, 2), (2, 3)):
+                pair = self.pair_model(first, second)
+                np.testing.assert_almost_equal(
+                    two_fold.get(first, second).params,
+                    pair.two_fold(two_fold_type=two_fold_type).params)
+                np.testing.assert_almost_equal(
+                    three_fold.get(first, second).params,
+                    pair.three_fold().params)
+
+    def test_reference(self):
+        full = self.model.pairwise()
+        ref = self.model.pairwise(reference=2)
+        np.testing.assert_almost_equal(ref.params[0][2], full.params[0][2])
+        np.testing.assert_almost_equal(ref.params[1][:, 2],
+                                       full.params[1][:, 2])
+        assert np.isnan(ref.params[0][0, 1])
+
+    def test_two_groups_required(self):
+        with pytest.raises(ValueError):
+            self.model.two_fold()
+
+
+class TestOaxacaReferenceCache(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3)
+
+    def test_cached(self):
+        pooled = self.model.two_fold().params
+        self.model.two_fold(two_fold_type='nuemark')
+        t_model = self.model._t_model
+        self.model.two_fold(two_fold_type='cotton')
+        np.testing.assert_almost_equal(self.model.two_fold().params, pooled)
+        self.model.two_fold(two_fold_type='nuemark')
+        assert self.model._t_model is t_model
+        assert len(self.model._reference_cache) == 2
+
+    def test_collinear(self):
+        collinear = np.column_stack((exog, 2 * exog[:, 0]))
+        with pytest.warns(CollinearityWarning):
+            OaxacaBlinder(endog, collinear, 3)
+
+
+class TestOaxacaMemmap(object):
+    def test_results(self, tmp_path):
+        np.save(tmp_path / 'endog.npy', endog)
+        np.save(tmp_path / 'exog.npy', exog)
+        mm_endog = np.load(tmp_path / 'endog.npy', mmap_mode='r')
+        mm_exog = np.load(tmp_path / 'exog.npy', mmap_mode='r')
+        model = OaxacaBlinder(mm_endog, mm_exog, 3, blocksize=10)
+        assert isinstance(model.exog, np.memmap)
+        in_memory = OaxacaBlinder(endog, exog, 3)
+        np.testing.assert_almost_equal(model.three_fold().params,
+                                       in_memory.three_fold().params)
+        for two_fold_type in ('pooled', 'nuemark', 'cotton'):
+            np.testing.assert_almost_equal(
+                model.two_fold(two_fold_type=two_fold_type).params,
+                in_memory.two_fold(two_fold_type=two_fold_type).params)
+        np.testing.assert_almost_equal(model._f_model.params,
+                                       in_memory._f_params)
+
+    def test_std(self, tmp_path):
+        np.save(tmp_path / 'exog.npy', exog)
+        mm_exog = np.load(tmp_path / 'exog.npy', mmap_mode='r')
+        model = OaxacaBlinder(endog, mm_exog, 3, blocksize=16)
+        np.random.seed(0)
+        std = model.two_fold(std=True, n=50).std
+        np.random.seed(0)
+        in_memory = OaxacaBlinder(endog, exog, 3)
+        np.testing.assert_almost_equal(
+            in_memory.two_fold(std=True, n=50).std, std)
+
+
+class TestOaxacaJackknife(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3, blocksize=20)
+
+    def refit_std(self, decompose, blocks):
+        reps = []
+        for rows in blocks:
+            keep = np.setdiff1d(np.arange(len(endog)), rows)
+            reps.append(decompose(OaxacaBlinder(endog[keep], exog[keep], 3)))
+        reps = np.array(reps)
+        m = len(reps)
+        return np.sqrt((m - 1) / m * ((reps - reps.mean(0)) ** 2).sum(0))
+
+    def test_delete_one(self):
+        blocks = [[i] for i in range(len(endog))]
+        np.testing.assert_almost_equal(
+            self.model.three_fold(std=True, vce='jackknife').std,
+            self.refit_std(lambda model: model.three_fold().params[:3],
+                           blocks))
+        for two_fold_type in ('pooled', 'nuemark', 'cotton'):
+            np.testing.assert_almost_equal(
+                self.model.two_fold(std=True, vce='jackknife',
+                                    two_fold_type=two_fold_type).std,
+                self.refit_std(
+                    lambda model: model.two_fold(
+                        two_fold_type=two_fold_type).params[:2],
+                    blocks))
+
+    def test_delete_d(self):
+        np.random.seed(3)
+        std = self.model.two_fold(std=True, vce='jackknife', d=5).std
+        np.random.seed(3)
+        blocks = np.array_split(np.random.permutation(len(endog)),
+                                len(endog) // 5)
+        np.testing.assert_almost_equal(
+            std, self.refit_std(lambda model: model.two_fold().params[:2],
+                                blocks))
+
+    def test_d_range(self):
+        for d in (0, len(endog) + 1):
+            with pytest.raises(ValueError):
+                self.model.two_fold(std=True, vce='jackknife', d=d)
+
+
+class TestOaxacaSubsample(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3)
+
+    def test_std(self):
+        np.random.seed(0)
+        boot = self.model.two_fold(std=True, n=400, conf=1).std
+        sub = self.model.two_fold(std=True, n=400, conf=1, vce='subsample',
+                                  m=36).std
+        np.testing.assert_allclose(sub, boot, rtol=.5)
+        sizes = self.model._subsample_sizes(36)
+        np.testing.assert_array_equal(sizes, [14, 22])
+        replicates = self.model._replicate_cache[('subsample', 400, 14, 22)]
+        assert np.all(replicates['nobs'] == sizes)
+
+    def test_m(self):
+        assert self.model._subsample_sizes().sum() == 17
+        with pytest.raises(ValueError):
+            self.model.two_fold(std=True, vce='subsample', m=72)
+
+
+class TestOaxacaStratified(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3)
+
+    def test_std(self):
+        np.random.seed(0)
+        boot = self.model.three_fold(std=True, n=400, conf=1).std
+        strat = self.model.three_fold(std=True, n=400, conf=1,
+                                      vce='stratified').std
+        np.testing.assert_allclose(strat, boot, rtol=.3)
+        replicates = self.model._replicate_cache[('stratified', 400)]
+        assert np.all(replicates['nobs'] == [self.model.len_f,
+                                             self.model.len_s])
+        assert len(np.unique(replicates['params'][:, 0, 0])) > 1
+
+    def test_seed(self):
+        fit = self.model.freeze()
+        std = fit.two_fold(std=True, n=50, vce='stratified', seed=3).std
+        np.testing.assert_allclose(
+            fit.two_fold(std=True, n=50, vce='stratified', seed=3).std, std)
+        assert not np.allclose(
+            fit.two_fold(std=True, n=50, seed=3).std, std)
+
+
+class TestOaxacaCotton(object):
+    # the cotton weights follow the groups when they are swapped, so the
+    # swapped decomposition is the negative of the unswapped one
+    def test_swap(self):
+        swapped = OaxacaBlinder(endog, exog, 3).two_fold(
+                                two_fold_type='cotton').params
+        unswapped = OaxacaBlinder(endog, exog, 3, swap=False).two_fold(
+                                two_fold_type='cotton').params
+        np.testing.assert_allclose(swapped, [-73.57848, 232.32893, 158.75044],
+                                   rtol=1e-6)
+        np.testing.assert_allclose(swapped, -np.array(unswapped))
+
+
+class TestOaxacaDiskCache(object):
+    def test_cached(self, tmp_path):
+        np.random.seed(0)
+        model = OaxacaBlinder(endog, exog, 3, cache_dir=str(tmp_path))
+        std = model.two_fold(std=True, n=50).std
+        np.random.seed(1)
+        cached = OaxacaBlinder(endog, exog, 3, cache_dir=str(tmp_path))
+        assert 'bootstrap-50-params' in cached._cache.arrays
+        np.testing.assert_almost_equal(cached.two_fold(std=True, n=50).std,
+                                       std)
+        np.testing.assert_almost_equal(cached.three_fold().params,
+                                       model.three_fold().params)
+        other = OaxacaBlinder(endog, exog, 3, swap=False,
+                              cache_dir=str(tmp_path))
+        assert other._cache.path != model._cache.path
+
+    def test_evict(self, tmp_path):
+        first = OaxacaBlinder(endog, exog, 3, cache_dir=str(tmp_path),
+                              cache_size=1)
+        second = OaxacaBlinder(endog[1:], exog[1:], 3,
+                               cache_dir=str(tmp_path), cache_size=1)
+        assert os.path.exists(second._cache.path)
+        assert not os.path.exists(first._cache.path)
+
+    def test_corrupted(self, tmp_path):
+        model = OaxacaBlinder(endog, exog, 3, cache_dir=str(tmp_path))
+        with open(model._cache.path, 'r+b') as f:
+            f.truncate(100)
+        rebuilt = OaxacaBlinder(endog, exog, 3, cache_dir=str(tmp_path))
+        np.testing.assert_almost_equal(rebuilt.two_fold().params,
+                                       model.two_fold().params)
+        assert 'groups' in OaxacaBlinder(endog, exog, 3,
+                                         cache_dir=str(tmp_path))._cache.arrays
+
+
+class TestOaxacaWeightSweep(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3)
+
+    def test_results(self):
+        np.random.seed(0)
+        sweep = self.model.weight_sweep([0, .3, 1], std=True, n=50)
+        for i, weight in enumerate(sweep.weights):
+            two_fold = self.model.two_fold(
+                std=True, two_fold_type='self_submitted',
+                submitted_weight=weight, n=50)
+            np.testing.assert_almost_equal(
+                [sweep.params[0][i], sweep.params[1][i], sweep.params[2]],
+                two_fold.params)
+            np.testing.assert_almost_equal(
+                [sweep.std[0][i], sweep.std[1][i]], two_fold.std)
+            assert sweep.bands[1][0][i] <= sweep.bands[1][1][i]
+
+
+class TestOaxacaArrow(object):
+    @classmethod
+    def setup_class(cls):
+        cls.pa = pytest.importorskip('pyarrow')
+        cls.expected = OaxacaBlinder(pd_endog, pd_exog, 'OWNRENT')
+
+    def check(self, model):
+        np.testing.assert_almost_equal(model.three_fold().params,
+                                       self.expected.three_fold().params)
+        np.testing.assert_almost_equal(model.two_fold().params,
+                                       self.expected.two_fold().params)
+
+    def test_arrow(self):
+        table = self.pa.Table.from_pandas(pd_exog, preserve_index=False)
+        model = OaxacaBlinder(self.pa.array(pd_endog), table, 'OWNRENT',
+                              blocksize=16)
+        assert np.shares_memory(model.exog.columns[0],
+                                table.column(0).chunk(0).to_numpy())
+        self.check(model)
+
+    def test_mixed(self):
+        table = self.pa.Table.from_pandas(pd_exog, preserve_index=False)
+        self.check(OaxacaBlinder(pd_endog, table, 'OWNRENT'))
+        self.check(OaxacaBlinder(np.asarray(pd_endog), table, 'OWNRENT'))
+
+    def test_polars(self):
+        pl = pytest.importorskip('polars')
+        frame = pl.from_pandas(pd_exog)
+        model = OaxacaBlinder(pl.from_pandas(pd_endog), frame, 'OWNRENT')
+        self.check(model)
+
+
+class TestOaxacaNumba(object):
+    def test_moments(self):
+        pytest.importorskip('numba')
+        from statsmodels.stats.oaxaca import _GroupMoments
+        groups = exog[:, 3] + 2 * (exog[:, 0] > 32)
+        data = exog.copy()
+        data[:, 3] = groups
+        weights = np.random.RandomState(0).randint(0, 3, len(endog))
+        for hasconst, cols in ((True, data), (False, data[:, :4])):
+            for row_weights in (None, weights):
+                args = (endog, cols, 3, np.array([2., 0., 3.]), hasconst,
+                        row_weights, 16)
+                fast = _GroupMoments.from_data(*args, backend='numba')
+                slow = _GroupMoments.from_data(*args, backend='numpy')
+                for name in _GroupMoments.names:
+                    np.testing.assert_allclose(getattr(fast, name),
+                                               getattr(slow, name),
+                                               rtol=1e-12)
+
+    def test_worker_thread(self):
+        # the model is built off the main thread in a fresh interpreter,
+        # which has to exit once the thread is done
+        pytest.importorskip('numba')
+        import subprocess
+        import sys
+        code = dedent("""\
+            import threading
+            from statsmodels.datasets.ccard.data import load_pandas
+            from statsmodels.stats.oaxaca import OaxacaBlinder
+            data = load_pandas()
+            params = []
+            thread = threading.Thread(target=lambda: params.append(
+                OaxacaBlinder(data.endog, data.exog, 'OWNRENT',
+                              hasconst=False, backend='numba')
+                .two_fold().params))
+            thread.start()
+            thread.join()
+            print(float(params[0][0]))""")
+        out = subprocess.run([sys.executable, '-c', code], timeout=120,
+                             capture_output=True, text=True)
+        assert out.returncode == 0, out.stderr
+        np.testing.assert_allclose(float(out.stdout), 27.94091, rtol=1e-6)
+
+    def test_fork(self):
+        # a process forked after the parallel kernel ran on the main
+        # thread must not keep the interpreter from exiting
+        pytest.importorskip('numba')
+        import subprocess
+        import sys
+        code = dedent("""\
+            import multiprocessing
+            from statsmodels.datasets.ccard.data import load_pandas
+            from statsmodels.stats.oaxaca import OaxacaBlinder
+            data = load_pandas()
+            OaxacaBlinder(data.endog, data.exog, 'OWNRENT', hasconst=False,
+                          backend='numba')
+            process = multiprocessing.get_context('fork').Process(
+                target=print)
+            process.start()
+            process.join()""")
+        out = subprocess.run([sys.executable, '-c', code], timeout=120,
+                             capture_output=True, text=True)
+        assert out.returncode == 0, out.stderr
+
+
+class TestOaxacaAbsorb(object):
+    @classmethod
+    def setup_class(cls):
+        cls.cat = (exog[:, 1] > np.median(exog[:, 1])) + 2 * (exog[:, 0] > 32)
+        cls.data = np.column_stack((exog[:, :4], cls.cat))
+        cls.model = OaxacaBlinder(endog, cls.data, 3, absorb=4)
+
+    def dummy_params(self, rows, indicator=False):
+        dummies = (self.cat[rows, None] == np.arange(4)).astype(float)
+        cols = [0, 1, 2, 3] if indicator else [0, 1, 2]
+        fit = OLS(endog[rows], np.column_stack((exog[rows][:, cols],
+                                                 dummies))).fit()
+        return fit.params[:3]
+
+    def test_two_fold(self):
+        first, second = self.model.bi
+        rows_f = np.where(exog[:, 3] == first)[0]
+        rows_s = np.where(exog[:, 3] == second)[0]
+        params_f = self.dummy_params(rows_f)
+        params_s = self.dummy_params(rows_s)
+        t_params = self.dummy_params(np.arange(len(endog)), True)
+        mean_f = exog[rows_f, :3].mean(0)
+        mean_s = exog[rows_s, :3].mean(0)
+        res = self.model.two_fold()
+        np.testing.assert_allclose(res.params[0],
+                                   mean_f @ (params_f - t_params)
+                                   + mean_s @ (t_params - params_s),
+                                   rtol=1e-6)
+        np.testing.assert_allclose(res.params[1],
+                                   (mean_f - mean_s) @ t_params, rtol=1e-6)
+        np.testing.assert_allclose(res.params[0] + res.params[1]
+                                   + res.fixed_effects, res.params[2])
+
+    def test_three_fold(self):
+        res = self.model.three_fold()
+        np.testing.assert_allclose(sum(res.params[:3]) + res.fixed_effects,
+                                   res.params[3])
+        assert OaxacaBlinder(endog, exog, 3).three_fold().fixed_effects is None
+
+    def test_bootstrap(self):
+        np.random.seed(0)
+        res = self.model.two_fold(True, n=20, conf=.9)
+        assert np.all(np.isfinite(res.std))
+        res = self.model.two_fold(True, n=20, conf=.9, vce='stratified')
+        assert np.all(np.isfinite(res.std))
+        replicates = self.model._replicate_cache[('stratified', 20)]
+        assert np.all(replicates['nobs'] == [self.model.len_f,
+                                             self.model.len_s])
+        with pytest.raises(ValueError):
+            self.model.two_fold(True, vce='jackknife')
+
+    def test_pairwise(self):
+        gap = self.model.gap
+        first, second = self.model.bi
+        for decomp_type in (2, 3):
+            res = self.model.pairwise(decomp_type).get(first, second)
+            np.testing.assert_allclose(
+                res.params, self.model.two_fold().params if decomp_type == 2
+                else self.model.three_fold().params)
+            np.testing.assert_allclose(sum(res.params[:-1])
+                                       + res.fixed_effects, gap)
+        sweep = self.model.weight_sweep([0, .5, 1])
+        np.testing.assert_allclose(sweep.params[0] + sweep.params[1]
+                                   + sweep.fixed_effects, gap)
+
+
+class TestOaxacaPartial(object):
+    @classmethod
+    def setup_class(cls):
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        shards = np.array_split(np.random.RandomState(0).permutation(
+                                len(endog)), 4)
+        # spawned processes stand in for the nodes, forking could copy
+        # the state of thread pools started by other tests
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing
+                                 .get_context('spawn')) as executor:
+            cls.parts = list(executor.map(
+                                OaxacaPartial.from_data,
+                                [endog[rows] for rows in shards],
+                                [exog[rows] for rows in shards],
+                                [3] * len(shards)))
+        cls.model = OaxacaBlinder(endog, exog, 3)
+
+    def test_finalize(self):
+        left = self.parts[0].merge(self.parts[1]).merge(
+                    self.parts[2].merge(self.parts[3]))
+        right = self.parts[3].merge(self.parts[2].merge(
+                    self.parts[1].merge(self.parts[0])))
+        for total in (left, right):
+            for two_fold_type in ('pooled', 'nuemark', 'cotton', 'reimers'):
+                np.testing.assert_allclose(
+                    total.finalize(2, two_fold_type).params,
+                    self.model.two_fold(two_fold_type=two_fold_type).params,
+                    rtol=1e-10)
+            np.testing.assert_allclose(total.finalize(3).params,
+                                       self.model.three_fold().params,
+                                       rtol=1e-10)
+
+    def test_bytes(self):
+        part = OaxacaPartial.from_bytes(self.parts[0].to_bytes())
+        assert part.names == self.parts[0].names
+        np.testing.assert_array_equal(part.moments.xtx,
+                                      self.parts[0].moments.xtx)
+
+    def test_errors(self):
+        rows = exog[:, 3] == 1
+        with pytest.raises(ValueError):
+            OaxacaPartial.from_data(endog[rows], exog[rows], 3).finalize(2)
+        with pytest.raises(ValueError):
+            self.parts[0].merge(OaxacaPartial.from_data(endog, exog[:, 1:],
+                                                        2))
+
+    def test_arrow(self):
+        pa = pytest.importorskip('pyarrow')
+        part = OaxacaPartial.from_data(pa.array(pd_endog),
+                                       pa.Table.from_pandas(pd_exog),
+                                       'OWNRENT')
+        assert part.names == ['AGE', 'INCOME', 'INCOMESQ', 'const']
+        np.testing.assert_allclose(part.finalize(2).params,
+                                   self.model.two_fold().params)
+
+
+class TestOaxacaScenarios(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3)
+        cls.shifts = np.array([[0, 0, 0, 0], [2, 0, 0, 0], [1, -.5, 3, 0]])
+
+    def test_shifts(self):
+        model = self.model
+        res = model.scenarios(shifts=self.shifts)
+        np.testing.assert_allclose([eff[0] for eff in res.params],
+                                   model.two_fold().params)
+        for decomp_type in (2, 3):
+            for two_fold_type in ('pooled', 'cotton'):
+                res = model.scenarios(shifts=self.shifts, group=model.bi[0],
+                                      decomp_type=decomp_type,
+                                      two_fold_type=two_fold_type)
+                for i, shift in enumerate(self.shifts):
+                    mean_f = model.exog_f_mean + shift
+                    if decomp_type == 3:
+                        expected = _three_fold(mean_f, model.exog_s_mean,
+                                               model._f_params,
+                                               model._s_params)
+                    else:
+                        model.two_fold(two_fold_type=two_fold_type)
+                        expected = _two_fold(
+                            mean_f, model.exog_s_mean, model._f_params,
+                            model._s_params, model.t_params)
+                    np.testing.assert_allclose(
+                        [eff[i] for eff in res.params[:-1]], expected)
+
+    def test_means(self):
+        model = self.model
+        means = np.vstack((model.exog_f_mean, model.exog_s_mean))
+        res = model.scenarios(means=means)
+        np.testing.assert_allclose(res.params[1][0], 0, atol=1e-8)
+        np.testing.assert_allclose(res.params[1][1],
+                                   model.two_fold().params[1])
+        np.testing.assert_allclose(res.params[2][0],
+                                   model.exog_f_mean @ (model._f_params
+                                                        - model._s_params))
+        with pytest.raises(ValueError):
+            model.scenarios(means=means[:, 1:])
+        with pytest.raises(ValueError):
+            model.scenarios()
+
+    def test_std(self):
+        np.random.seed(0)
+        res = self.model.scenarios(shifts=self.shifts, std=True, n=50)
+        np.random.seed(0)
+        two_fold = self.model.two_fold(std=True, n=50)
+        np.testing.assert_allclose([std[0] for std in res.std[:2]],
+                                   two_fold.std)
+        assert np.all(res.bands[0][0] <= res.bands[0][1])
+
+
+class TestOaxacaLazyStd(object):
+    def test_lazy(self):
+        model = OaxacaBlinder(endog, exog, 3)
+        np.random.seed(0)
+        eager = model.two_fold(std=True, two_fold_type='cotton', n=50).std
+        res = model.two_fold(std='lazy', two_fold_type='cotton', n=50)
+        assert res._std is None
+        np.testing.assert_almost_equal(res.params,
+                                       model.two_fold(
+                                           two_fold_type='cotton').params)
+        # the cached replicates are shared, so the options bound at the
+        # call give the same standard errors after other calls
+        model.two_fold(two_fold_type='reimers')
+        np.testing.assert_almost_equal(res.std_future().result(timeout=60),
+                                       eager)
+        assert res.std is res.std
+        assert res.std_progress() == 1
+        assert res.cancel_std() is False
+        three = model.three_fold(std='lazy', vce='jackknife')
+        np.testing.assert_almost_equal(
+            three.std, model.three_fold(std=True, vce='jackknife').std)
+
+    def test_cancel(self):
+        model = OaxacaBlinder(endog, exog, 3)
+        res = model.two_fold(std='lazy', n=100000)
+        future = res.std_future()
+        while res.std_progress() == 0:
+            time.sleep(.01)
+        assert 0 < res.std_progress() < 1
+        assert res.cancel_std()
+        assert future.cancelled()
+        with pytest.raises(CancelledError):
+            future.result()
+        assert res.std_future() is not future
+        assert res.cancel_std()
+        assert res.std_progress() == 0
+
+
+class TestOaxacaSpecifications(object):
+    def test_subsets(self):
+        model = OaxacaBlinder(pd_endog, pandas_df.exog.assign(const=1.),
+                              'OWNRENT')
+        specs = {'full': ['AGE', 'INCOME', 'INCOMESQ', 'const'],
+                 'age': ['AGE', 'const'], 'income': [1, 2, 3]}
+        for two_fold_type in ('pooled', 'nuemark', 'cotton', 'reimers'):
+            res = model.specifications(specs, two_fold_type=two_fold_type)
+            for i, spec in enumerate(specs.values()):
+                names = [model._names[col] if isinstance(col, int) else col
+                         for col in spec]
+                sub = OaxacaBlinder(pd_endog, pandas_df.exog.assign(
+                                    const=1.)[names + ['OWNRENT']],
+                                    'OWNRENT')
+                expected = sub.two_fold(two_fold_type=two_fold_type).params
+                np.testing.assert_allclose([res.params[0][i],
+                                            res.params[1][i]],
+                                           expected[:2], rtol=1e-8)
+        three = model.specifications([['AGE', 'const']], decomp_type=3)
+        sub = OaxacaBlinder(pd_endog, pandas_df.exog.assign(const=1.)[
+                            ['AGE', 'const', 'OWNRENT']], 'OWNRENT')
+        np.testing.assert_allclose([eff[0] for eff in three.params[:3]],
+                                   sub.three_fold().params[:3])
+        assert three.labels == ['AGE, const']
+        with pytest.raises(ValueError):
+            model.specifications([['AGE', 'TENURE']])
+
+
+class TestOaxacaFit(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3)
+        cls.fit = cls.model.freeze()
+
+    def test_options(self):
+        model = OaxacaBlinder(endog, exog, 3)
+        model.two_fold(std=True, n=20)
+        model.three_fold(std=True, n=30)
+        assert sorted(model._replicate_cache) == [20, 30]
+        model.three_fold(std=True)
+        assert sorted(model._replicate_cache) == [20, 30, 5000]
+
+    def test_frozen(self):
+        fit = self.fit
+        assert isinstance(fit, OaxacaFit)
+        with pytest.raises(AttributeError):
+            fit.gap = 0
+        with pytest.raises(ValueError):
+            fit.f_params[0] = 0
+        model = OaxacaBlinder(endog, exog, 3)
+        for two_fold_type in ('pooled', 'nuemark', 'cotton', 'reimers'):
+            np.testing.assert_allclose(
+                fit.two_fold(two_fold_type=two_fold_type).params,
+                model.two_fold(two_fold_type=two_fold_type).params)
+        np.testing.assert_allclose(fit.three_fold().params,
+                                   model.three_fold().params)
+        with pytest.raises(ValueError):
+            fit.two_fold(two_fold_type='self_submitted')
+        first = fit.two_fold(std=True, n=30, seed=1).std
+        np.testing.assert_allclose(fit.two_fold(std=True, n=30, seed=1).std,
+                                   first)
+        assert fit._model.two_fold_type is None
+        assert fit._model._replicate_cache == {}
+
+    def test_threads(self):
+        fit = self.fit
+        jobs = [(fit.two_fold, {'two_fold_type': 'cotton'}),
+                (fit.three_fold, {}),
+                (fit.two_fold, {'two_fold_type': 'nuemark'}),
+                (fit.two_fold, {'vce': 'subsample', 'm': 40}),
+                (fit.three_fold, {'vce': 'jackknife', 'd': 3})] * 2
+        expected = [func(std=True, n=40, seed=i, **kwds).std
+                    for i, (func, kwds) in enumerate(jobs)]
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(func, std=True, n=40, seed=i, **kwds)
+                       for i, (func, kwds) in enumerate(jobs)]
+            for future, std in zip(futures, expected):
+                np.testing.assert_allclose(future.result().std, std)
+
+    def test_blas_threads(self, monkeypatch):
+        calls = []
+
+        class Limits(object):
+            def __init__(self, limits, user_api):
+                calls.append(limits)
+
+            def restore_original_limits(self):
+                calls.append('restore')
+
+        class FakeThreadpoolctl(object):
+            threadpool_limits = Limits
+
+        monkeypatch.setattr(oaxaca, 'threadpoolctl', FakeThreadpoolctl)
+        with oaxaca._blas_threads(4):
+            with oaxaca._blas_threads(2):
+                pass
+        assert calls == [4, 2, 4, 'restore']
+        std = self.fit.two_fold(std=True, n=20, seed=0, blas_threads=1).std
+        np.testing.assert_allclose(
+            self.fit.two_fold(std=True, n=20, seed=0).std, std)
+        monkeypatch.setattr(oaxaca, 'threadpoolctl', None)
+        with pytest.raises(ValueError):
+            self.fit.two_fold(std=True, n=20, blas_threads=1)
+
+
+class TestOaxacaBatch(object):
+    @classmethod
+    def setup_class(cls):
+        cls.model = OaxacaBlinder(endog, exog, 3)
+        cls.batch = OaxacaBatchResults(capacity=2)
+        cls.results = [
+            cls.batch.append(cls.model, 'all'),
+            cls.batch.append(cls.model.freeze(), 'frozen', 3, std=True,
+                             n=20, seed=0),
+            cls.batch.append(cls.model, 'all', two_fold_type='cotton'),
+            cls.batch.append(cls.model, 'all', std='lazy')]
+
+    def test_columns(self):
+        columns = self.batch.columns
+        assert len(self.batch) == 4
+        assert self.batch.labels == ['all', 'frozen']
+        np.testing.assert_array_equal(columns['label'], [0, 1, 0, 0])
+        np.testing.assert_array_equal(columns['decomp_type'], [2, 3, 2, 2])
+        np.testing.assert_array_equal(columns['two_fold_type'],
+                                      [0, -1, 2, 0])
+        assert columns['nobs_f'].dtype == np.int64
+        np.testing.assert_array_equal(columns['nobs_f'], self.model.len_f)
+        np.testing.assert_array_equal(columns['group_f'], self.model.bi[0])
+        np.testing.assert_allclose(columns['unexplained'][[0, 2]],
+                                   [self.results[0].params[0],
+                                    self.results[2].params[0]])
+        np.testing.assert_allclose(columns['interaction'][1],
+                                   self.results[1].params[2])
+        np.testing.assert_allclose(columns['std_endowment'][1],
+                                   self.results[1].std[0])
+        assert np.isnan(columns['explained'][1])
+        assert np.isnan(columns['std_unexplained'][[0, 3]]).all()
+        np.testing.assert_allclose(columns['gap'], self.model.gap)
+        assert np.all(columns['seconds'] >= 0)
+
+    def test_pandas(self):
+        frame = self.batch.to_pandas()
+        assert len(frame) == 4
+        assert np.shares_memory(frame['gap'].to_numpy(),
+                                self.batch.columns['gap'])
+        assert np.shares_memory(frame['label'].array.codes,
+                                self.batch.columns['label'])
+        assert list(frame['label']) == ['all', 'frozen', 'all', 'all']
+        assert frame['two_fold_type'].isna().tolist() == [False, True,
+                                                          False, False]
+
+    def test_arrow(self, tmp_path):
+        pa = pytest.importorskip('pyarrow')
+        pq = pytest.importorskip('pyarrow.parquet')
+        table = self.batch.to_arrow()
+        gap = table.column('gap').chunks[0]
+        assert gap.buffers()[1].address == (
+                        self.batch.columns['gap'].ctypes.data)
+        assert table.column('two_fold_type').null_count == 1
+        path = str(tmp_path / 'batch.parquet')
+        self.batch.to_parquet(path)
+        stored = pq.read_table(path)
+        assert stored.column_names == table.column_names
+        np.testing.assert_allclose(stored.column('unexplained').to_numpy(),
+                                   self.batch.columns['unexplained'])
+        assert stored.column('label').to_pylist() == ['all', 'frozen',
+                                                      'all', 'all']
+        assert isinstance(pa.table(stored), pa.Table)
+
+    def test_labels(self):
+        batch = OaxacaBatchResults()
+        results = self.results[0]
+        for i in range(200):
+            batch.add(results, i)
+        assert batch.columns['label'].dtype == np.int16
+        frame = batch.to_pandas()
+        assert np.shares_memory(frame['label'].array.codes,
+                                batch.columns['label'])
+        assert list(frame['label'][[0, 199]]) == ['0', '199']
+
+    def test_summary(self, capsys):
+        text = self.batch.summary(print_out=False)
+        assert capsys.readouterr().out == ''
+        assert text.splitlines()[0] == (
+                        'Oaxaca-Blinder Batch of 4 Decompositions')
+        assert len(text.splitlines()) == 6
+        text = self.results[1].summary(print_out=False)
+        assert capsys.readouterr().out == ''
+        assert text.startswith('Oaxaca-Blinder Three-fold Effects')
+        assert self.results[0].summary() + '\n' == capsys.readouterr().out
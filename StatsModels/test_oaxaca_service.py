@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from statsmodels.datasets.ccard.data import load_pandas
+from statsmodels.stats.oaxaca import OaxacaBlinder
+from statsmodels.stats.oaxaca_service import OaxacaService
+from statsmodels.tools.tools import add_constant
+
+pandas_df = load_pandas()
+endog = pandas_df.endog.values
+exog = add_constant(pandas_df.exog.values, prepend=False)
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read())
+
+
+async def serve(service, requests):
+    # registers ccard and sends the requests at once, each request is a
+    # path and a payload, or bytes sent as they are
+    server = await service.start()
+    host, port = server.sockets[0].getsockname()[:2]
+    url = 'http://{}:{}'.format(host, port)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, post, url + '/datasets/ccard', {
+        'endog': endog.tolist(), 'exog': exog.tolist(), 'bifurcate': 3})
+
+    async def send(request):
+        if isinstance(request, bytes):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return int(response.split(b' ')[1])
+        return await loop.run_in_executor(None, post, url + request[0],
+                                          request[1])
+    try:
+        return await asyncio.gather(*[send(request) for request in requests])
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+
+
+class TestOaxacaService(object):
+    def test_batched(self):
+        service = OaxacaService(batch_window=.05)
+        requests = [{'decomp': 'two_fold'},
+                    {'decomp': 'three_fold'},
+                    {'decomp': 'two_fold', 'two_fold_type': 'cotton'},
+                    {'decomp': 'two_fold'},
+                    {'decomp': 'two_fold', 'std': True, 'n': 20}]
+        results = asyncio.run(serve(service, [('/decompose/ccard', request)
+                                              for request in requests]))
+        model = OaxacaBlinder(endog, exog, 3)
+        np.testing.assert_almost_equal(results[0]['params'],
+                                       model.two_fold().params)
+        np.testing.assert_almost_equal(results[1]['params'],
+                                       model.three_fold().params)
+        np.testing.assert_almost_equal(
+            results[2]['params'],
+            model.two_fold(two_fold_type='cotton').params)
+        assert results[3] == results[0]
+        assert results[0]['std'] is None
+        assert len(results[4]['std']) == 2
+        assert np.all(np.array(results[4]['std']) > 0)
+        assert service.batches < len(results)
+        assert service.executor._shutdown
+
+    def test_errors(self):
+        requests = [('/decompose/ccard', {'decomp': 'two_fold', 'std': True,
+                                          'n': 0}),
+                    ('/decompose/ccard', {'decomp': 'two_fold', 'foo': 1}),
+                    ('/decompose/other', {}),
+                    ('/decompose/ccard', {'decomp': 'pairwise',
+                                          'reference': 0.}),
+                    b'garbage\r\n\r\n']
+        results = asyncio.run(serve(OaxacaService(), requests))
+        assert results[0][0] == 500
+        assert results[1][0] == 400
+        assert results[2][0] == 404
+        assert results[3]['params'][0][1][1] is None
+        assert results[4] == 400
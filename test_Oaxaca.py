@@ -0,0 +1,84 @@
+import re
+
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+
+from Oaxaca import plot_many
+
+
+results = [(1., 2., 3.), (2., -1., .5, 1.5)] * 6 + [(1., 1., 2.)]
+
+
+def test_plot_many_pdf(tmp_path):
+    path = str(tmp_path / 'report.pdf')
+    assert plot_many(results, path, ncols = 2, nrows = 3) == [path]
+    with open(path, 'rb') as pdf:
+        pages = re.findall(rb'/Type\s*/Page\b', pdf.read())
+    assert len(pages) == 3
+
+
+def test_plot_many_png(tmp_path):
+    written = plot_many(results, str(tmp_path / 'report.png'), ncols = 2, nrows = 3)
+    assert written == [str(tmp_path / 'report_{}.png'.format(page)) for page in range(3)]
+    assert all((tmp_path / 'report_{}.png'.format(page)).exists() for page in range(3))
+    assert plot_many([], str(tmp_path / 'empty.png')) == []
+
+
+def test_plot_many_types():
+    with pytest.raises(ValueError):
+        plot_many(results, 'report.pdf', plt_types = 5)
+
+
+def test_pairwise():
+    import pandas as pd
+    from Oaxaca import Oaxaca
+    rs = np.random.RandomState(0)
+    data = pd.DataFrame({'x': rs.rand(300), 'g': rs.randint(0, 3, 300)})
+    data['y'] = 2 * data.x + data.g + rs.rand(300)
+    model = Oaxaca(data, 'g', 'y')
+    res = model.pairwise()
+    pair = Oaxaca(data[data.g != 2], 'g', 'y')
+    unexplained, explained, gap = pair.two_fold(round_val = False)
+    first = list(res.groups).index(pair.f_df.g.iloc[0])
+    second = list(res.groups).index(pair.s_df.g.iloc[0])
+    np.testing.assert_allclose(res.params[2][first, second], gap)
+    np.testing.assert_allclose(res.params[0][first, second], unexplained)
+    with pytest.raises(ValueError):
+        model.two_fold()
+
+
+def test_groups_fixed():
+    import pandas as pd
+    from Oaxaca import Oaxaca
+    rs = np.random.RandomState(0)
+    data = pd.DataFrame({'x': rs.rand(300), 'g': (rs.rand(300) < .3).astype(int)})
+    # the most common group has the smaller mean, so it is swapped to second
+    data['y'] = 2 * data.x + 3 * data.g + rs.rand(300)
+    model = Oaxaca(data, 'g', 'y')
+    first = model.f_df
+    assert (first.g == 1).all()
+    two = model.two_fold(round_val = False)
+    three = model.three_fold(round_val = False)
+    assert model.f_df is first
+    assert two[2] > 0
+    np.testing.assert_allclose(three[3], two[2])
+    np.testing.assert_allclose(model.two_fold(round_val = False), two)
+
+
+def test_verbose(capsys):
+    import pandas as pd
+    from Oaxaca import Oaxaca
+    rs = np.random.RandomState(0)
+    data = pd.DataFrame({'x': rs.rand(100), 'g': rs.randint(0, 2, 100)})
+    data['y'] = 2 * data.x + data.g + rs.rand(100)
+    model = Oaxaca(data, 'g', 'y', verbose = False)
+    model.two_fold()
+    model.three_fold()
+    model.cotton_model(plot = False)
+    model.var()
+    assert capsys.readouterr().out == ''
+    Oaxaca(data, 'g', 'y').two_fold()
+    assert 'Gap' in capsys.readouterr().out